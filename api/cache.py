@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+MAX_ENTRIES = int(os.environ.get("ARBITRAGEX_CACHE_SIZE", 2048))
+DEFAULT_TTL = float(os.environ.get("ARBITRAGEX_CACHE_TTL", 60))
+# How long past its TTL an entry may still be served while it is refreshed.
+STALE_TTL = float(os.environ.get("ARBITRAGEX_CACHE_STALE", 240))
+
+# Rates move on a scale of minutes. TapTap publishes one catalog for all
+# corridors and refreshes it rarely, so it can live longer.
+PROVIDER_TTLS = {
+    "Remitly": 60,
+    "TapTap Send": 300,
+    "Wise": 60,
+    "Western Union": 60,
+    "WorldRemit": 60,
+    "Sendwave": 60,
+}
+
+# ==============================================================================
+# CACHE
+# ==============================================================================
+class QuoteCache:
+    """Bounded LRU of provider results with per-provider TTLs.
+
+    Keys are tuples whose first element is the provider name. Entries past
+    their TTL but inside the stale window are returned immediately and
+    refreshed in the background (stale-while-revalidate).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttls=None, default_ttl=DEFAULT_TTL, stale_ttl=STALE_TTL):
+        self.max_entries = max_entries
+        self.ttls = dict(PROVIDER_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="arbx-refresh")
+        self.counters = {"hit": 0, "stale": 0, "miss": 0, "refresh": 0, "refresh_error": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def ttl_for(self, key):
+        return self.ttls.get(key[0], self.default_ttl)
+
+    def peek(self, key):
+        """Returns (value, age) without touching LRU order or counters."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None, None
+        value, stored_at = entry
+        return value, time.time() - stored_at
+
+    def put(self, key, value):
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch):
+        """Returns (value, info) where info is {"status", "age"}.
+
+        Empty results are never cached, so a provider that returned nothing
+        is asked again on the next request.
+        """
+        if not self.enabled:
+            return fetch(), {"status": "miss", "age": 0.0}
+
+        now = time.time()
+        ttl = self.ttl_for(key)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age <= ttl:
+                    self._data.move_to_end(key)
+                    self.counters["hit"] += 1
+                    return value, {"status": "hit", "age": round(age, 1)}
+                if age <= ttl + self.stale_ttl:
+                    self._data.move_to_end(key)
+                    self.counters["stale"] += 1
+                    start_refresh = key not in self._refreshing
+                    if start_refresh:
+                        self._refreshing.add(key)
+                else:
+                    entry = None
+            if entry is None:
+                self.counters["miss"] += 1
+
+        if entry is not None:
+            if start_refresh:
+                self._refresh_pool.submit(self._refresh, key, fetch)
+            return value, {"status": "stale", "age": round(age, 1)}
+
+        value = fetch()
+        self.put(key, value)
+        return value, {"status": "miss", "age": 0.0}
+
+    def _refresh(self, key, fetch):
+        ok = True
+        try:
+            self.put(key, fetch())
+        except Exception:
+            ok = False
+        with self._lock:
+            self._refreshing.discard(key)
+            self.counters["refresh" if ok else "refresh_error"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        return dict(self.counters, size=size, max_entries=self.max_entries)
+
+QUOTE_CACHE = QuoteCache()
@@ -0,0 +1,187 @@
+import contextvars
+import fcntl
+import json
+import os
+import threading
+import time
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+CAPABILITIES_PATH = os.environ.get("ARBITRAGEX_CAPABILITIES", "/tmp/arbitragex-capabilities.json")
+# An empty answer is usually about the amount (below a minimum, above a
+# limit), not the corridor. Plain empties only mark a corridor unsupported
+# once they came back at this many distinct amounts inside the sane range;
+# fetchers that can tell (mark_unsupported) mark it at once. Outside that
+# range nothing is learned: upstreams answer out-of-range amounts with the
+# same errors they use for unserved corridors.
+NEGATIVE_AFTER = 3
+EMPTY_MIN_AMOUNT = 20.0
+EMPTY_MAX_AMOUNT = 5000.0
+# How long a corridor stays skipped before one call re-probes it
+NEGATIVE_TTL = float(os.environ.get("ARBITRAGEX_CAPABILITY_TTL", 6 * 3600))
+# Other callers keep skipping while that re-probe is in flight
+PROBE_GRACE = 60.0
+SAVE_INTERVAL = 10.0
+
+# Set by the engine around each fetcher run; sub-request threads share it
+# through their copied context.
+_current_call = contextvars.ContextVar("arbitragex_capability_call", default=None)
+
+def begin_capability_call():
+    return _current_call.set({"unsupported": None})
+
+def end_capability_call(token):
+    """Returns the reason given to mark_unsupported during the call, if any."""
+    call = _current_call.get()
+    _current_call.reset(token)
+    return call["unsupported"] if call else None
+
+def mark_unsupported(reason):
+    """Called by a fetcher when the upstream said the corridor itself is not
+    served (whatever the amount). A no-op outside an engine call."""
+    call = _current_call.get()
+    if call is not None:
+        call["unsupported"] = reason
+
+def _key(name, query):
+    _, send_curr, recv_curr, send_cty, recv_cty = query
+    return f"{name}|{send_curr}|{send_cty}|{recv_curr}|{recv_cty}"
+
+# ==============================================================================
+# INDEX
+# ==============================================================================
+class CapabilityIndex:
+    """Which corridors each provider serves, learned from its answers.
+
+    An answer with quotes marks the corridor supported and records its
+    payout categories. A fetcher's mark_unsupported, or empty answers at
+    NEGATIVE_AFTER distinct sane amounts, make a negative entry that
+    expires after NEGATIVE_TTL. Failures teach nothing. Entries are merged
+    into a JSON file shared by all workers (newest observation wins).
+    """
+
+    def __init__(self, path=CAPABILITIES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}      # key -> {supported, categories, empty_amounts, reason, checked_at, expires_at}
+        self._dirty = False
+        self._loaded = False
+        self._synced_at = 0.0
+        self.counters = {"skipped": 0, "probes": 0}
+
+    # --- dispatch -----------------------------------------------------------
+    def allows(self, name, query):
+        """False when the corridor is known unsupported; once the negative
+        entry has expired, lets a single caller through to re-probe."""
+        self._sync()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(_key(name, query))
+            if entry is None or entry["supported"] is not False:
+                return True
+            if now < entry["expires_at"]:
+                self.counters["skipped"] += 1
+                return False
+            entry["expires_at"] = now + PROBE_GRACE
+            self.counters["probes"] += 1
+            return True
+
+    def known_unsupported(self, name, query):
+        """Whether allows() would skip the corridor right now, without
+        counting a skip or handing out the re-probe."""
+        self._sync()
+        with self._lock:
+            entry = self._entries.get(_key(name, query))
+            return entry is not None and entry["supported"] is False and time.time() < entry["expires_at"]
+
+    # --- learning -----------------------------------------------------------
+    def record(self, name, query, quotes, unsupported=None):
+        """Quotes of a fetch that completed without upstream errors, and the
+        fetcher's mark_unsupported reason if it gave one."""
+        now = time.time()
+        amount = query[0]
+        key = _key(name, query)
+        with self._lock:
+            entry = self._entries.get(key) or {"supported": None, "categories": [], "expires_at": 0.0}
+            empty_amounts = entry.get("empty_amounts", [])
+            if quotes:
+                categories = sorted({q["category"] for q in quotes} | set(entry["categories"] if entry["supported"] else []))
+                entry.update(supported=True, categories=categories, empty_amounts=[], reason=None, expires_at=0.0)
+            elif not EMPTY_MIN_AMOUNT <= amount <= EMPTY_MAX_AMOUNT:
+                return
+            elif unsupported:
+                entry.update(supported=False, categories=[], empty_amounts=[], reason=unsupported, expires_at=now + NEGATIVE_TTL)
+            else:
+                empty_amounts = sorted(set(empty_amounts) | {amount})
+                if len(empty_amounts) >= NEGATIVE_AFTER:
+                    reason = f"empty at {len(empty_amounts)} amounts"
+                    entry.update(supported=False, categories=[], empty_amounts=[], reason=reason, expires_at=now + NEGATIVE_TTL)
+                else:
+                    entry["empty_amounts"] = empty_amounts
+            entry["checked_at"] = now
+            self._entries[key] = entry
+            self._dirty = True
+        self._sync()
+
+    # --- persistence --------------------------------------------------------
+    def _sync(self):
+        """Merges with the shared file at most every SAVE_INTERVAL."""
+        now = time.time()
+        if self._loaded and now - self._synced_at < SAVE_INTERVAL:
+            return
+        with self._lock:
+            if self._loaded and now - self._synced_at < SAVE_INTERVAL:
+                return
+            self._synced_at = now
+            self._loaded = True
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    self._merge_file()
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        except (OSError, ValueError) as e:
+            print(f"Capability index not synced ({self.path}): {e}")
+
+    def _merge_file(self):
+        try:
+            with open(self.path) as f:
+                on_disk = json.load(f)
+        except FileNotFoundError:
+            on_disk = {}
+        with self._lock:
+            for key, entry in on_disk.items():
+                mine = self._entries.get(key)
+                if mine is None or entry.get("checked_at", 0) > mine.get("checked_at", 0):
+                    self._entries[key] = entry
+            dirty, self._dirty = self._dirty, False
+            data = {k: dict(v) for k, v in self._entries.items()}
+        if not dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    # --- status -------------------------------------------------------------
+    def status(self):
+        self._sync()
+        now = time.time()
+        corridors = {}
+        with self._lock:
+            for key, entry in sorted(self._entries.items()):
+                name, send_curr, send_cty, recv_curr, recv_cty = key.split("|")
+                corridors.setdefault(name, []).append({
+                    "corridor": f"{send_curr}-{send_cty}>{recv_curr}-{recv_cty}",
+                    "supported": entry["supported"],
+                    "categories": entry["categories"],
+                    "reason": entry.get("reason"),
+                    "checked_at": entry.get("checked_at"),
+                    "reprobe_in": round(entry["expires_at"] - now, 1) if entry["supported"] is False else None,
+                })
+        return {"path": self.path, "counters": dict(self.counters), "providers": corridors}
+
+CAPABILITIES = CapabilityIndex()
@@ -0,0 +1,356 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from . import metrics, transport
+from .cache import QUOTE_CACHE
+from .capabilities import CAPABILITIES, begin_capability_call, end_capability_call
+from .health import CircuitOpen, HEDGING, health_for
+from .ratelimit import MAX_WAIT, RATE_LIMITER, RateLimited
+from .reference_rates import REFERENCE_RATES
+from .singleflight import PROVIDER_FLIGHTS
+from .providers import PROVIDERS
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# Overall budget for one comparison. Whatever has not answered by then is
+# reported as timed out instead of holding up the response.
+DEFAULT_DEADLINE = float(os.environ.get("ARBITRAGEX_DEADLINE", 8.0))
+MAX_DEADLINE = 30.0
+
+# Provider calls run here. Timed-out calls keep their worker until the
+# upstream timeout fires, so this is sized well above len(PROVIDERS).
+WORKERS = int(os.environ.get("ARBITRAGEX_WORKERS", 32))
+_POOL = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="arbx-provider")
+
+# Batch requests get their own pool: its size is the global limit on
+# concurrent provider calls across all batches, and a large batch cannot
+# starve interactive /api/quotes traffic.
+BATCH_CONCURRENCY = int(os.environ.get("ARBITRAGEX_BATCH_CONCURRENCY", 16))
+MAX_BATCH_QUERIES = int(os.environ.get("ARBITRAGEX_MAX_BATCH", 100))
+_BATCH_POOL = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="arbx-batch")
+
+# Both attempts of a hedged call run here. Every thread that can call a
+# provider (the pools above, the quote cache's background refreshes and the
+# prefetcher) may have two attempts in flight, so hedging never queues a
+# call behind other providers' attempts. Threads are only started on demand.
+BACKGROUND_CALLERS = 8
+_HEDGE_POOL = ThreadPoolExecutor(
+    max_workers=2 * (WORKERS + BATCH_CONCURRENCY + BACKGROUND_CALLERS),
+    thread_name_prefix="arbx-hedge",
+)
+
+# ==============================================================================
+# QUOTE LISTENERS
+# ==============================================================================
+# Called as fn(provider_name, query, quotes) with every non-empty result
+# fetched from an upstream (cache hits are not repeated). Listeners run on
+# the fetching thread and must return quickly.
+QUOTE_LISTENERS = []
+
+def add_quote_listener(fn):
+    QUOTE_LISTENERS.append(fn)
+
+def _notify(name, query, quotes):
+    for fn in QUOTE_LISTENERS:
+        try:
+            fn(name, query, quotes)
+        except Exception as e:
+            print(f"Quote listener {getattr(fn, '__name__', fn)} failed: {e}")
+
+# ==============================================================================
+# HELPERS
+# ==============================================================================
+def normalize_query(amount, send_curr, recv_curr, send_cty, recv_cty):
+    return (float(amount), send_curr.upper(), recv_curr.upper(), send_cty.upper(), recv_cty.upper())
+
+def clamp_deadline(deadline):
+    if deadline is None:
+        return DEFAULT_DEADLINE
+    return min(max(float(deadline), 0.1), MAX_DEADLINE)
+
+def _as_list(res):
+    if not res:
+        return []
+    return res if isinstance(res, list) else [res]
+
+class UpstreamError(Exception):
+    pass
+
+def _attempt(name, fn, query, limit):
+    # Fetchers return None both for "nothing on offer" and for failures they
+    # swallowed; the upstream tally tells the two apart. Raising keeps a
+    # failed fetch out of the cache. Returns (quotes, unsupported reason).
+    token = metrics.begin_provider_call(name)
+    capability = begin_capability_call()
+    cap = transport.timeout_cap.set(limit)
+    try:
+        quotes = _as_list(fn(*query))
+    finally:
+        transport.timeout_cap.reset(cap)
+        unsupported = end_capability_call(capability)
+        upstream = metrics.end_provider_call(token)
+    if not quotes and upstream["errors"]:
+        raise UpstreamError(f"{upstream['errors']} of {upstream['requests']} upstream requests failed")
+    return quotes, unsupported
+
+def _run_fetcher(name, fn, query, hedge_delay=None):
+    # One logical call, hedged or not, records its outcome once: health,
+    # capabilities and listeners only see the attempt that was used.
+    health = health_for(name)
+    limit = health.timeout()
+    started = time.monotonic()
+    try:
+        if hedge_delay is None:
+            quotes, unsupported = _attempt(name, fn, query, limit)
+        else:
+            quotes, unsupported = _hedged(name, fn, query, limit, hedge_delay)
+    except Exception:
+        elapsed = time.monotonic() - started
+        health.record_failure(timed_out_at=limit if elapsed >= limit else None)
+        raise
+    health.record_success(time.monotonic() - started)
+    # A clean answer (with or without quotes) says whether the corridor is served
+    CAPABILITIES.record(name, query, quotes, unsupported)
+    if quotes:
+        _notify(name, query, quotes)
+    return quotes
+
+def _hedged(name, fn, query, limit, delay):
+    # Fire a second identical attempt once the first is past the provider's
+    # p95 and take whichever succeeds first.
+    first = _HEDGE_POOL.submit(contextvars.copy_context().run, _attempt, name, fn, query, limit)
+    try:
+        return first.result(timeout=delay)
+    except FuturesTimeout:
+        pass
+
+    # The hedge is extra upstream traffic: only fire it if a token is free now
+    try:
+        RATE_LIMITER.acquire(name, max_wait=0)
+    except RateLimited:
+        return first.result()
+    metrics.record_hedge(name)
+    second = _HEDGE_POOL.submit(contextvars.copy_context().run, _attempt, name, fn, query, limit)
+    error = None
+    for fut in as_completed([first, second]):
+        try:
+            return fut.result()
+        except Exception as e:
+            error = e
+    raise error
+
+def _fetch_upstream(name, fn, query, max_wait=MAX_WAIT, hedge=True):
+    # Shared with the other worker processes; raises RateLimited (before the
+    # breaker is asked, so a skipped call never uses up a half-open probe).
+    RATE_LIMITER.acquire(name, max_wait=max_wait)
+    health = health_for(name)
+    if not health.allow():
+        raise CircuitOpen(f"{name} skipped: circuit open")
+    delay = health.hedge_delay() if HEDGING and hedge else None
+    return _run_fetcher(name, fn, query, delay)
+
+def _call_provider(name, fn, query, max_wait=MAX_WAIT):
+    started = time.monotonic()
+    if not CAPABILITIES.allows(name, query):
+        return _unsupported_result(name, time.monotonic() - started)
+    cache_info = None
+    key = (name,) + query
+    # Cache misses and background refreshes for the same key share one
+    # upstream call across all request threads.
+    fetch = lambda: PROVIDER_FLIGHTS.do(key, lambda: _fetch_upstream(name, fn, query, max_wait))
+    try:
+        quotes, cache_info = QUOTE_CACHE.get_or_fetch(key, fetch)
+        # Cached lists are shared between requests, so annotate copies
+        quotes = [dict(q, age=cache_info["age"]) for q in quotes]
+        status = "ok" if quotes else "empty"
+        error = None
+    except (RateLimited, CircuitOpen) as e:
+        # Nothing was sent upstream: an expired cache entry beats no answer
+        cached, age = QUOTE_CACHE.peek(key)
+        if cached:
+            cache_info = {"status": "expired", "age": round(age, 1)}
+            quotes, status, error = [dict(q, age=cache_info["age"]) for q in cached], "ok", None
+        else:
+            status = "rate_limited" if isinstance(e, RateLimited) else "circuit_open"
+            quotes, error = [], str(e)
+    except Exception as e:
+        quotes, status, error = [], "error", str(e)
+    # Markup against mid-market, from the shared reference table (no upstream call)
+    REFERENCE_RATES.annotate(query, quotes)
+    elapsed = time.monotonic() - started
+    metrics.record_provider_call(name, status, elapsed, len(quotes))
+    return {
+        "provider": name,
+        "status": status,
+        "quotes": quotes,
+        "error": error,
+        "cache": cache_info,
+        "elapsed": elapsed,
+    }
+
+def _unsupported_result(name, elapsed):
+    # Known not to serve this corridor; re-probed once the entry expires
+    metrics.record_provider_call(name, "unsupported", elapsed, 0)
+    return {
+        "provider": name,
+        "status": "unsupported",
+        "quotes": [],
+        "error": None,
+        "cache": None,
+        "elapsed": elapsed,
+    }
+
+def _timeout_result(name, elapsed):
+    return {
+        "provider": name,
+        "status": "timeout",
+        "quotes": [],
+        "error": None,
+        "cache": None,
+        "elapsed": elapsed,
+    }
+
+def _summarize(by_provider, elapsed, timings=False):
+    quotes = []
+    for name, _ in PROVIDERS:
+        quotes.extend(by_provider[name]["quotes"])
+
+    for r in by_provider.values():
+        if r["status"] == "error":
+            print(f"Error fetching from {r['provider']}: {r['error']}")
+
+    summary = {
+        "quotes": quotes,
+        "providers": {name: by_provider[name]["status"] for name, _ in PROVIDERS},
+        "timed_out": [name for name, _ in PROVIDERS if by_provider[name]["status"] == "timeout"],
+        "cache": {name: by_provider[name]["cache"] for name, _ in PROVIDERS if by_provider[name]["cache"]},
+        "breakers": {name: health_for(name).state for name, _ in PROVIDERS},
+        "elapsed": round(elapsed, 3),
+    }
+    if timings:
+        summary["timings"] = {
+            name: {"status": r["status"], "ms": round(r["elapsed"] * 1000, 1)}
+            for name, r in by_provider.items()
+        }
+    return summary
+
+# ==============================================================================
+# ENGINE
+# ==============================================================================
+def _collect(pending, deadline, started):
+    """pending maps future -> (tag, provider name). Yields (tag, result) as
+    futures complete; whatever is left at the deadline is cancelled (if not
+    yet started) and yielded as a timeout."""
+    while pending:
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for fut in done:
+            tag, _ = pending.pop(fut)
+            yield tag, fut.result()
+
+    for fut, (tag, name) in sorted(pending.items(), key=lambda item: item[1][1]):
+        fut.cancel()
+        metrics.record_deadline_exceeded(name)
+        yield tag, _timeout_result(name, time.monotonic() - started)
+
+def iter_provider_results(query, deadline=None, providers=None):
+    """Yields one result dict per provider, in order of arrival.
+
+    Providers still running when the deadline passes are yielded last with
+    status "timeout" (their threads finish in the background).
+    """
+    deadline = clamp_deadline(deadline)
+    started = time.monotonic()
+    pending = {
+        _POOL.submit(_call_provider, name, fn, query): (name, name)
+        for name, fn in (providers or PROVIDERS)
+    }
+    for _, result in _collect(pending, deadline, started):
+        yield result
+
+def fetch_quotes(amount, send_curr, recv_curr, send_cty, recv_cty, deadline=None, timings=False):
+    query = normalize_query(amount, send_curr, recv_curr, send_cty, recv_cty)
+    started = time.monotonic()
+    by_provider = {r["provider"]: r for r in iter_provider_results(query, deadline)}
+    return _summarize(by_provider, time.monotonic() - started, timings=timings)
+
+def stream_quotes(amount, send_curr, recv_curr, send_cty, recv_cty, deadline=None):
+    """Yields a "provider" event as each provider answers (or times out),
+    then one "summary" event with the same fields as fetch_quotes minus the
+    quotes already sent."""
+    query = normalize_query(amount, send_curr, recv_curr, send_cty, recv_cty)
+    started = time.monotonic()
+    by_provider = {}
+    for r in iter_provider_results(query, deadline):
+        by_provider[r["provider"]] = r
+        yield {
+            "type": "provider",
+            "provider": r["provider"],
+            "status": r["status"],
+            "quotes": r["quotes"],
+            "cache": r["cache"],
+            "elapsed": round(r["elapsed"], 3),
+        }
+
+    summary = _summarize(by_provider, time.monotonic() - started)
+    del summary["quotes"]
+    summary["type"] = "summary"
+    yield summary
+
+def refresh_provider(name, query):
+    """Fetches one provider for one normalized query straight from the
+    upstream and stores the result in the quote cache (prefetching)."""
+    fn = dict(PROVIDERS)[name]
+    key = (name,) + query
+    # Prefetching never queues for a rate-limit token, and is not hedged:
+    # nobody waits on it, and its upstream requests are paid from a budget
+    quotes = PROVIDER_FLIGHTS.do(key, lambda: _fetch_upstream(name, fn, query, max_wait=0, hedge=False))
+    QUOTE_CACHE.put(key, quotes)
+    return quotes
+
+def fetch_batch(queries, deadline=None):
+    """queries is a list of (amount, send_curr, recv_curr, send_cty, recv_cty).
+
+    Duplicates are fetched once. Every (query, provider) call of the batch is
+    scheduled on the shared batch pool under one deadline, and one result
+    block is returned per input query, in input order.
+    """
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise ValueError(f"Too many queries ({len(queries)} > {MAX_BATCH_QUERIES})")
+
+    normalized = [normalize_query(*q) for q in queries]
+    unique = list(dict.fromkeys(normalized))
+
+    deadline = clamp_deadline(deadline)
+    started = time.monotonic()
+    pending = {}
+    for query in unique:
+        for name, fn in PROVIDERS:
+            pending[_BATCH_POOL.submit(_call_provider, name, fn, query)] = (query, name)
+
+    by_query = {query: {} for query in unique}
+    for query, result in _collect(pending, deadline, started):
+        by_query[query][result["provider"]] = result
+
+    elapsed = time.monotonic() - started
+    blocks = {query: _summarize(by_query[query], elapsed) for query in unique}
+
+    results = []
+    for query in normalized:
+        amount, send_curr, recv_curr, send_cty, recv_cty = query
+        block = dict(blocks[query])
+        block["query"] = {"amount": amount, "sendCurr": send_curr, "recvCurr": recv_curr, "sendCty": send_cty, "recvCty": recv_cty}
+        results.append(block)
+
+    return {
+        "results": results,
+        "unique_queries": len(unique),
+        "provider_calls": len(unique) * len(PROVIDERS),
+        "elapsed": round(elapsed, 3),
+    }
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import deque
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# The hard-coded per-request timeouts in quotes.py stay as upper bounds; the
+# adaptive timeout can only tighten them.
+MAX_TIMEOUTS = {
+    "Remitly": 10.0,
+    "TapTap Send": 5.0,
+    "Wise": 10.0,
+    "Western Union": 15.0,
+    "WorldRemit": 10.0,
+    "Sendwave": 10.0,
+}
+MIN_TIMEOUT = float(os.environ.get("ARBITRAGEX_MIN_TIMEOUT", 1.0))
+TIMEOUT_FACTOR = float(os.environ.get("ARBITRAGEX_TIMEOUT_FACTOR", 2.0))
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+FAILURE_THRESHOLD = int(os.environ.get("ARBITRAGEX_BREAKER_FAILURES", 5))
+COOLDOWN = float(os.environ.get("ARBITRAGEX_BREAKER_COOLDOWN", 30))
+HALF_OPEN_PROBES = int(os.environ.get("ARBITRAGEX_BREAKER_PROBES", 2))
+
+# Hedged retries add upstream load, so they are opt-in
+HEDGING = os.environ.get("ARBITRAGEX_HEDGE", "0") == "1"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpen(Exception):
+    pass
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    idx = min(int(round(pct / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+# ==============================================================================
+# PER-PROVIDER HEALTH
+# ==============================================================================
+class ProviderHealth:
+    """Latency window, adaptive timeout and circuit breaker for one provider.
+
+    closed    -> every call goes through; FAILURE_THRESHOLD consecutive
+                 failures open the breaker.
+    open      -> calls are skipped until COOLDOWN has passed.
+    half_open -> up to HALF_OPEN_PROBES calls at a time are let through;
+                 that many successes close the breaker, one failure re-opens it.
+    """
+
+    def __init__(self, name, max_timeout=10.0):
+        self.name = name
+        self.max_timeout = max_timeout
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    # --- latency ------------------------------------------------------------
+    def percentiles(self):
+        with self._lock:
+            values = sorted(self._latencies)
+        return {
+            "samples": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+        }
+
+    def timeout(self):
+        # A provider that just failed, or is being probed, gets the full
+        # budget: its old p99 may be what cut it off.
+        if self.state != CLOSED or self.failures:
+            return self.max_timeout
+        p = self.percentiles()
+        if p["samples"] < MIN_SAMPLES:
+            return self.max_timeout
+        return min(max(p["p99"] * TIMEOUT_FACTOR, MIN_TIMEOUT), self.max_timeout)
+
+    def hedge_delay(self):
+        """Past this many seconds a call is in the tail and may be hedged."""
+        p = self.percentiles()
+        if p["samples"] < MIN_SAMPLES:
+            return None
+        return p["p95"]
+
+    # --- breaker ------------------------------------------------------------
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < COOLDOWN:
+                    return False
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= HALF_OPEN_PROBES:
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self, elapsed):
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                self._probe_successes += 1
+                if self._probe_successes >= HALF_OPEN_PROBES:
+                    self.state = CLOSED
+
+    def record_failure(self, timed_out_at=None):
+        """timed_out_at: the timeout a call ran into. It is kept as a latency
+        sample so the adaptive timeout can grow back when the provider slows
+        down, instead of cutting off every call from then on."""
+        with self._lock:
+            if timed_out_at is not None:
+                self._latencies.append(timed_out_at)
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+                self.state = OPEN
+                self.opened_at = time.time()
+                self._probes_in_flight = 0
+
+    def status(self):
+        p = self.percentiles()
+        with self._lock:
+            state, failures, opened_at = self.state, self.failures, self.opened_at
+        return {
+            "state": state,
+            "consecutive_failures": failures,
+            "opened_at": opened_at,
+            "timeout": round(self.timeout(), 3),
+            "latency": {k: (round(v, 3) if isinstance(v, float) else v) for k, v in p.items()},
+        }
+
+_health = {}
+_health_lock = threading.Lock()
+
+def health_for(name):
+    h = _health.get(name)
+    if h is None:
+        with _health_lock:
+            h = _health.get(name)
+            if h is None:
+                h = _health[name] = ProviderHealth(name, MAX_TIMEOUTS.get(name, 10.0))
+    return h
+
+def status():
+    with _health_lock:
+        items = list(_health.items())
+    return {name: h.status() for name, h in items}
@@ -0,0 +1,300 @@
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# /tmp is the only writable location on Vercel
+HISTORY_DIR = os.environ.get("ARBITRAGEX_HISTORY_DIR", "/tmp/arbitragex-history")
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0
+MAX_POINTS = 500
+# Longest window one query may scan (every day in it is a directory lookup)
+MAX_SPAN = 366 * 86400
+
+# One file per column per UTC day: <root>/<YYYY-MM-DD>/<column>.bin
+# (numpy dtype strings; numpy itself is only imported by the writer thread
+# and by queries, never on the request path of /api/quotes)
+COLUMNS = {
+    "ts": "<f8",
+    "corridor": "<u2",
+    "provider": "<u2",
+    "category": "u1",
+    "amount": "<f8",
+    "rate": "<f8",
+    "fee": "<f8",
+    "recipient_gets": "<f8",
+}
+VALUE_FIELDS = ("rate", "fee", "recipient_gets")
+SYMBOL_COLUMNS = ("corridor", "provider", "category")
+
+def corridor_key(send_curr, recv_curr, send_cty, recv_cty):
+    return f"{send_curr.upper()}-{send_cty.upper()}>{recv_curr.upper()}-{recv_cty.upper()}"
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+# ==============================================================================
+# STORE
+# ==============================================================================
+class HistoryStore:
+    """Append-only, day-chunked columnar store of every fetched quote.
+
+    String columns (corridor, provider, category) are stored as small integer
+    codes; the code tables live in symbols.json. record() only enqueues, a
+    background thread does the disk writes. Writes from several worker
+    processes are serialized with an flock on the store directory.
+    """
+
+    def __init__(self, root=HISTORY_DIR, queue_size=QUEUE_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.root = root
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._symbols = {name: [] for name in SYMBOL_COLUMNS}
+        self._symbols_mtime = None
+        self._symbols_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.counters = {"queued": 0, "written": 0, "dropped": 0, "write_errors": 0}
+
+    # --- write path ---------------------------------------------------------
+    def record(self, provider, query, quotes):
+        """Quote listener: never blocks, drops rows if the writer falls behind."""
+        amount, send_curr, recv_curr, send_cty, recv_cty = query
+        corridor = corridor_key(send_curr, recv_curr, send_cty, recv_cty)
+        now = time.time()
+        for q in quotes:
+            row = (now, corridor, q["provider"], q["category"], amount, q["rate"], q["fee"], q["recipient_gets"])
+            try:
+                self._queue.put_nowait(row)
+                self.counters["queued"] += 1
+            except queue.Full:
+                self.counters["dropped"] += 1
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="arbx-history", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write_rows(rows)
+                self.counters["written"] += len(rows)
+            except Exception as e:
+                self.counters["write_errors"] += 1
+                print(f"History write failed: {e}")
+
+    def write_rows(self, rows):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._load_symbols()
+                by_day = {}
+                for row in rows:
+                    by_day.setdefault(_day(row[0]), []).append(row)
+                for day, day_rows in by_day.items():
+                    self._append_day(day, day_rows)
+                self._save_symbols()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_day(self, day, rows):
+        import numpy as np
+
+        ts, corridor, provider, category, amount, rate, fee, recipient_gets = zip(*rows)
+        columns = {
+            "ts": ts,
+            "corridor": [self._code("corridor", v) for v in corridor],
+            "provider": [self._code("provider", v) for v in provider],
+            "category": [self._code("category", v) for v in category],
+            "amount": amount,
+            "rate": rate,
+            "fee": fee,
+            "recipient_gets": recipient_gets,
+        }
+        path = os.path.join(self.root, day)
+        os.makedirs(path, exist_ok=True)
+        # Trim any partially written tail first, so every column stays the
+        # same length and rows stay aligned.
+        rows_on_disk = self._row_count(path)
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(path, f"{name}.bin"), "ab") as f:
+                f.truncate(rows_on_disk * np.dtype(dtype).itemsize)
+                np.asarray(columns[name], dtype=dtype).tofile(f)
+
+    # --- symbols ------------------------------------------------------------
+    def _symbols_path(self):
+        return os.path.join(self.root, "symbols.json")
+
+    def _load_symbols(self):
+        path = self._symbols_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime == self._symbols_mtime:
+            return
+        with open(path) as f:
+            data = json.load(f)
+        with self._symbols_lock:
+            self._symbols = {name: list(data.get(name, [])) for name in SYMBOL_COLUMNS}
+            self._symbols_mtime = mtime
+
+    def _save_symbols(self):
+        path = self._symbols_path()
+        tmp = path + ".tmp"
+        with self._symbols_lock:
+            data = {name: list(values) for name, values in self._symbols.items()}
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        self._symbols_mtime = os.path.getmtime(path)
+
+    def _code(self, column, value):
+        with self._symbols_lock:
+            values = self._symbols[column]
+            try:
+                return values.index(value)
+            except ValueError:
+                values.append(value)
+                return len(values) - 1
+
+    def _lookup(self, column, value):
+        self._load_symbols()
+        with self._symbols_lock:
+            values = self._symbols[column]
+            return values.index(value) if value in values else None
+
+    # --- read path ----------------------------------------------------------
+    @staticmethod
+    def _row_count(path):
+        import numpy as np
+
+        counts = []
+        for name, dtype in COLUMNS.items():
+            try:
+                counts.append(os.path.getsize(os.path.join(path, f"{name}.bin")) // np.dtype(dtype).itemsize)
+            except OSError:
+                return 0
+        return min(counts)
+
+    def _open_day(self, day):
+        import numpy as np
+
+        path = os.path.join(self.root, day)
+        n = self._row_count(path)
+        if n == 0:
+            return None
+        return {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(n,))
+            for name, dtype in COLUMNS.items()
+        }
+
+    def _days(self, start, end):
+        day = int(start // 86400) * 86400
+        while day < end:
+            yield _day(day)
+            day += 86400
+
+    def query(self, corridor, start, end, bucket=None, field="rate", provider=None, category=None, amount=None):
+        """min/max/last of `field` per time bucket, one series per provider."""
+        import numpy as np
+
+        if field not in VALUE_FIELDS:
+            raise ValueError(f"field must be one of {', '.join(VALUE_FIELDS)}")
+        if end <= start:
+            raise ValueError("end must be after start")
+        if end - start > MAX_SPAN:
+            raise ValueError(f"window must be at most {MAX_SPAN // 86400} days")
+        bucket = float(bucket) if bucket else max((end - start) / MAX_POINTS, 1.0)
+
+        empty = {"corridor": corridor, "field": field, "bucket": bucket, "start": start, "end": end, "rows": 0, "series": {}}
+        corridor_code = self._lookup("corridor", corridor)
+        if corridor_code is None:
+            return empty
+        filters = {}
+        for column, value in (("provider", provider), ("category", category)):
+            if value is not None:
+                code = self._lookup(column, value)
+                if code is None:
+                    return empty
+                filters[column] = code
+
+        ts_parts, prov_parts, val_parts = [], [], []
+        for day in self._days(start, end):
+            cols = self._open_day(day)
+            if cols is None:
+                continue
+            ts = cols["ts"]
+            mask = (cols["corridor"] == corridor_code) & (ts >= start) & (ts < end)
+            for column, code in filters.items():
+                mask &= cols[column] == code
+            if amount is not None:
+                mask &= cols["amount"] == amount
+            ts_parts.append(ts[mask])
+            prov_parts.append(cols["provider"][mask])
+            val_parts.append(cols[field][mask])
+
+        if not ts_parts or not sum(len(p) for p in ts_parts):
+            return empty
+
+        ts = np.concatenate(ts_parts)
+        prov = np.concatenate(prov_parts)
+        val = np.concatenate(val_parts)
+        buckets = ((ts - start) // bucket).astype(np.int64)
+
+        # Sort by (provider, bucket, ts); each run of equal (provider, bucket)
+        # is one output point, reduced with ufunc.reduceat.
+        order = np.lexsort((ts, buckets, prov))
+        prov, buckets, val = prov[order], buckets[order], val[order]
+        boundary = np.ones(len(order), dtype=bool)
+        boundary[1:] = (prov[1:] != prov[:-1]) | (buckets[1:] != buckets[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(order)) - 1
+
+        mins = np.minimum.reduceat(val, starts)
+        maxs = np.maximum.reduceat(val, starts)
+        lasts = val[ends]
+        counts = ends - starts + 1
+        group_prov = prov[starts]
+        group_t = start + buckets[starts] * bucket
+
+        with self._symbols_lock:
+            names = list(self._symbols["provider"])
+        series = {}
+        for code in np.unique(group_prov):
+            sel = group_prov == code
+            series[names[code]] = {
+                "t": group_t[sel].tolist(),
+                "min": mins[sel].tolist(),
+                "max": maxs[sel].tolist(),
+                "last": lasts[sel].tolist(),
+                "count": counts[sel].tolist(),
+            }
+        return dict(empty, rows=int(len(order)), series=series)
+
+    def stats(self):
+        return dict(self.counters, pending=self._queue.qsize(), root=self.root)
+
+HISTORY = HistoryStore()
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+
+from flask import jsonify, request
+
+from .cache import QUOTE_CACHE
+from .capabilities import CAPABILITIES
+from .providers import PROVIDERS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# Fields that change on every response without the data changing
+VOLATILE_FIELDS = {"age", "elapsed", "timings", "cache", "breakers"}
+# Partial answers (a provider timed out or failed) are only cached briefly
+INCOMPLETE_MAX_AGE = 5
+# Smaller bodies are not worth the CPU (and fit in one packet anyway)
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# ==============================================================================
+# HELPERS
+# ==============================================================================
+def _strip(value):
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    return value
+
+def etag_for(payload):
+    """Weak ETag over the payload minus volatile fields. Quotes are hashed
+    as a set, so provider completion order does not change the tag."""
+    data = _strip(payload)
+    if isinstance(data, dict) and isinstance(data.get("quotes"), list):
+        data["quotes"] = sorted(data["quotes"], key=lambda q: json.dumps(q, sort_keys=True))
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(body.encode(), digest_size=12).hexdigest()
+
+def cache_control(max_age, stale=0):
+    if max_age <= 0:
+        return "no-cache"
+    value = f"public, max-age={int(max_age)}, s-maxage={int(max_age)}"
+    if stale > 0:
+        value += f", stale-while-revalidate={int(stale)}"
+    return value
+
+def quote_freshness(outcome):
+    """(max_age, stale) for a fetch_quotes envelope: the time left before the
+    soonest provider result in it expires from the quote cache."""
+    statuses = outcome.get("providers", {})
+    remaining = [
+        QUOTE_CACHE.ttl_for((name,)) - info["age"]
+        for name, info in outcome.get("cache", {}).items()
+        if statuses.get(name) == "ok"
+    ]
+    max_age = max(min(remaining), 0) if remaining else 0
+    if any(s in ("timeout", "error", "circuit_open", "rate_limited") for s in statuses.values()):
+        return min(max_age, INCOMPLETE_MAX_AGE), INCOMPLETE_MAX_AGE
+    return max_age, QUOTE_CACHE.stale_ttl
+
+def stream_freshness(query):
+    """(max_age, stale) for a streamed answer to `query`, decided before
+    any provider has answered. Full freshness needs every provider to come
+    from the quote cache; one that still has to be called may time out or
+    fail, so the stream gets the partial-answer lifetime at most."""
+    remaining, live = [], False
+    for name, _ in PROVIDERS:
+        if CAPABILITIES.known_unsupported(name, query):
+            continue
+        cached, age = QUOTE_CACHE.peek((name,) + query)
+        if cached is None:
+            live = True
+        else:
+            remaining.append(QUOTE_CACHE.ttl_for((name,)) - age)
+    max_age = max(min(remaining), 0) if remaining else INCOMPLETE_MAX_AGE
+    if live:
+        return min(max_age, INCOMPLETE_MAX_AGE), INCOMPLETE_MAX_AGE
+    return max_age, QUOTE_CACHE.stale_ttl
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def _compress(response):
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESS_MIN_BYTES:
+        return
+    if encoding == "br":
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+
+# ==============================================================================
+# RESPONSES
+# ==============================================================================
+def json_response(payload, max_age=0, stale=0, etag=True, compress=False):
+    """jsonify() plus Cache-Control, a weak ETag answered with 304 on a
+    matching If-None-Match, and optional gzip/brotli negotiation."""
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = cache_control(max_age, stale)
+    if etag:
+        response.set_etag(etag_for(payload), weak=True)
+        response.make_conditional(request)
+    if compress and response.status_code == 200:
+        _compress(response)
+    return response
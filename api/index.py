@@ -1,17 +1,47 @@
-from flask import Flask, request, jsonify
+import json
+import os
+import time
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS  # Imported
-from .quotes import (
-    get_sendwave_quote,
-    get_westernunion_quote,
-    get_worldremit_quote,
-    get_remitly_quote,
-    get_taptap_quote,
-    get_wise_quote,
-)
+from .cache import QUOTE_CACHE
+from .capabilities import CAPABILITIES
+from .fanout import add_quote_listener, fetch_quotes, fetch_batch, normalize_query, stream_quotes
+from .history import HISTORY, corridor_key
+from .http_cache import cache_control, json_response, quote_freshness, stream_freshness
+from .metrics import REGISTRY
+from .prefetch import PREFETCHER
+from .pricing_model import PRICING_MODEL
+from .ratelimit import RATE_LIMITER
+from .reference_rates import REFERENCE_RATES
+from .routing import RATE_GRAPH, MAX_HOPS
+from . import health
+from .singleflight import PROVIDER_FLIGHTS
+from .sweep import CATEGORIES, sweep
+from . import transport
+
+# Edge/browser cache lifetimes (seconds) for responses that are not plain
+# provider quotes; /api/quotes derives its own from the quote cache.
+ESTIMATE_MAX_AGE = 10
+SWEEP_MAX_AGE = 30
+HISTORY_MAX_AGE = 30
+HISTORY_SETTLED_MAX_AGE = 86400
 
 app = Flask(__name__)
 CORS(app)  # <--- CRITICAL: This line was missing! Enables access from frontend.
 
+# Every fetched quote is appended to the on-disk history (background writer)
+add_quote_listener(HISTORY.record)
+# ... and feeds the provider rate graph used by /api/routes
+add_quote_listener(RATE_GRAPH.update)
+# ... and the per-provider amount/tier model behind ?mode=estimate
+add_quote_listener(PRICING_MODEL.observe)
+
+# Background refresh of popular corridors. Only useful in a long-lived
+# process (gunicorn); serverless instances are frozen between requests.
+if os.environ.get("ARBITRAGEX_PREFETCH") == "1":
+    PREFETCHER.start()
+
 # Serve the frontend (or just status check)
 @app.route("/")
 def index():
@@ -27,37 +57,264 @@ def api_quotes():
         send_cty = request.args.get("sendCty", "US")
         recv_cty = request.args.get("recvCty", "MA")
 
-        quotes = []
-
-        # Single-result providers
-        for p in [get_remitly_quote, get_taptap_quote, get_wise_quote]:
-            try:
-                res = (
-                    p(amount, send_curr, recv_curr, send_cty, recv_cty)
-                    if p != get_wise_quote
-                    else p(amount, send_curr, recv_curr, send_cty)
-                )
-                if res:
-                    quotes.append(res)
-            except Exception as e:
-                print(f"Error fetching from provider: {e}")
-                continue
-
-        # Multi-result providers
-        for p_multi in [get_westernunion_quote, get_worldremit_quote, get_sendwave_quote]:
-            try:
-                res_list = p_multi(amount, send_curr, recv_curr, send_cty, recv_cty)
-                if res_list:
-                    quotes.extend(res_list)
-            except Exception as e:
-                print(f"Error fetching from multi-provider: {e}")
-                continue
-
-        return jsonify(quotes)
-        
+        # Answered from the pricing model only: no upstream calls, and only
+        # for amounts inside the range already observed per provider.
+        if request.args.get("mode") == "estimate":
+            started = time.perf_counter()
+            quotes = PRICING_MODEL.estimate_quotes(amount, send_curr, recv_curr, send_cty, recv_cty)
+            quotes.sort(key=lambda q: -q["recipient_gets"])
+            payload = {"quotes": quotes, "mode": "estimate", "elapsed": round(time.perf_counter() - started, 6)}
+            return json_response(payload, max_age=ESTIMATE_MAX_AGE, stale=ESTIMATE_MAX_AGE)
+
+        deadline = request.args.get("deadline", type=float)
+        timings = request.args.get("timings") in ("1", "true")
+        PREFETCHER.record_demand(normalize_query(amount, send_curr, recv_curr, send_cty, recv_cty))
+
+        # All providers run at the same time under one overall deadline
+        outcome = fetch_quotes(amount, send_curr, recv_curr, send_cty, recv_cty, deadline=deadline, timings=timings)
+
+        # ?rank=true_cost orders by total cost against mid-market (quotes
+        # without a reference rate go last); default is provider order.
+        outcome["reference"] = REFERENCE_RATES.info()
+        if request.args.get("rank") == "true_cost":
+            outcome["quotes"].sort(key=lambda q: (q.get("true_cost") is None, q.get("true_cost") or 0.0))
+
+        # Cacheable at the edge until the soonest provider result expires
+        max_age, stale = quote_freshness(outcome)
+        return json_response(outcome, max_age=max_age, stale=stale)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Same query as /api/quotes, but each provider's quotes are sent as soon as
+# they arrive, followed by a final summary event. NDJSON by default,
+# Server-Sent Events with ?format=sse or Accept: text/event-stream.
+@app.route("/api/quotes/stream")
+def api_quotes_stream():
+    try:
+        amount = float(request.args.get("amount", 100))
+        deadline = request.args.get("deadline", type=float)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    send_curr = request.args.get("sendCurr", "USD")
+    recv_curr = request.args.get("recvCurr", "MAD")
+    send_cty = request.args.get("sendCty", "US")
+    recv_cty = request.args.get("recvCty", "MA")
+
+    query = normalize_query(amount, send_curr, recv_curr, send_cty, recv_cty)
+    PREFETCHER.record_demand(query)
+    # Decided up front: headers go out before the first provider answers
+    max_age, stale = stream_freshness(query)
+
+    sse = request.args.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+
+    def generate():
+        for event in stream_quotes(amount, send_curr, recv_curr, send_cty, recv_cty, deadline=deadline):
+            line = json.dumps(event, ensure_ascii=False)
+            yield f"event: {event['type']}\ndata: {line}\n\n" if sse else line + "\n"
+
+    headers = {"Cache-Control": cache_control(max_age, stale), "X-Accel-Buffering": "no"}
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+# Many corridors x amounts in one call. Body is either
+#   {"queries": [{"amount", "sendCurr", "recvCurr", "sendCty", "recvCty"}, ...]}
+# or the cross product
+#   {"corridors": [{"sendCurr", "recvCurr", "sendCty", "recvCty"}, ...], "amounts": [50, 100]}
+@app.route("/api/quotes/batch", methods=["POST"])
+def api_quotes_batch():
+    body = request.get_json(silent=True) or {}
+    try:
+        items = body.get("queries")
+        if items is None:
+            items = [dict(c, amount=a) for c in body.get("corridors", []) for a in body.get("amounts", [])]
+        queries = [
+            (
+                float(q.get("amount", 100)),
+                q.get("sendCurr", "USD"),
+                q.get("recvCurr", "MAD"),
+                q.get("sendCty", "US"),
+                q.get("recvCty", "MA"),
+            )
+            for q in items
+        ]
+        if not queries:
+            raise ValueError("No queries given")
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"error": f"Invalid batch: {e}"}), 400
+
+    try:
+        return json_response(fetch_batch(queries, deadline=body.get("deadline")), etag=False, compress=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Amounts where the best provider of each payout category changes, between
+# min and max. Upstream queries are spent bisecting only the intervals whose
+# ends disagree; amounts already cached cost nothing.
+@app.route("/api/sweep")
+def api_sweep():
+    try:
+        category = request.args.get("category")
+        result = sweep(
+            request.args.get("sendCurr", "USD"),
+            request.args.get("recvCurr", "MAD"),
+            request.args.get("sendCty", "US"),
+            request.args.get("recvCty", "MA"),
+            request.args.get("min", 10, type=float),
+            request.args.get("max", 2000, type=float),
+            categories=(category,) if category else CATEGORIES,
+            resolution=request.args.get("resolution", 1.0, type=float),
+            max_queries=min(request.args.get("maxQueries", 60, type=int), 200),
+            deadline=request.args.get("deadline", type=float),
+        )
+        return json_response(result, max_age=SWEEP_MAX_AGE, stale=SWEEP_MAX_AGE, compress=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Best direct or multi-hop route (e.g. USD->EUR->MAD) from quotes already
+# observed; never calls an upstream. Routes are compared at equal total
+# outlay, so fees charged on top are deducted from the amount sent.
+@app.route("/api/routes")
+def api_routes():
+    try:
+        amount = float(request.args.get("amount", 100))
+        max_hops = min(max(request.args.get("maxHops", MAX_HOPS, type=int), 1), 3)
+        routes = RATE_GRAPH.best_routes(
+            amount,
+            request.args.get("sendCurr", "USD"),
+            request.args.get("recvCurr", "MAD"),
+            request.args.get("sendCty", "US"),
+            request.args.get("recvCty", "MA"),
+            max_hops=max_hops,
+            category=request.args.get("category"),
+            limit=request.args.get("limit", 5, type=int),
+        )
+        return jsonify({"routes": routes, "graph": RATE_GRAPH.stats()})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Pricing tiers detected per provider for one corridor (what ?mode=estimate
+# interpolates over). Each breakpoint is reported as the interval it lies in.
+@app.route("/api/pricing-model")
+def api_pricing_model():
+    return jsonify({
+        "providers": PRICING_MODEL.describe(
+            request.args.get("sendCurr", "USD"),
+            request.args.get("recvCurr", "MAD"),
+            request.args.get("sendCty", "US"),
+            request.args.get("recvCty", "MA"),
+        ),
+    })
+
+# Rate/fee history for one corridor, downsampled to min/max/last per bucket.
+# start/end are unix seconds (default: last 24h), bucket is in seconds.
+@app.route("/api/history")
+def api_history():
+    try:
+        now = time.time()
+        end = request.args.get("end", type=float) or now
+        start = request.args.get("start", type=float) or end - 86400
+        corridor = corridor_key(
+            request.args.get("sendCurr", "USD"),
+            request.args.get("recvCurr", "MAD"),
+            request.args.get("sendCty", "US"),
+            request.args.get("recvCty", "MA"),
+        )
+        result = HISTORY.query(
+            corridor,
+            start,
+            end,
+            bucket=request.args.get("bucket", type=float),
+            field=request.args.get("field", "rate"),
+            provider=request.args.get("provider"),
+            category=request.args.get("category"),
+            amount=request.args.get("amount", type=float),
+        )
+        # A window that closed before the last flush can no longer change
+        settled = end < now - HISTORY.flush_interval * 5
+        return json_response(result, max_age=HISTORY_SETTLED_MAX_AGE if settled else HISTORY_MAX_AGE, compress=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Upstream connection pool stats (warm requests show up as "reused")
+@app.route("/api/transport")
+def api_transport():
+    return jsonify(transport.stats())
+
+# Quote cache counters (hit / stale / miss / background refreshes)
+@app.route("/api/cache")
+def api_cache():
+    return jsonify(QUOTE_CACHE.stats())
+
+# Per-provider breaker state, adaptive timeout and latency percentiles
+@app.route("/api/health")
+def api_health():
+    return jsonify(health.status())
+
+# Coalesced upstream calls (identical requests that shared one in-flight call)
+@app.route("/api/singleflight")
+def api_singleflight():
+    return jsonify(PROVIDER_FLIGHTS.stats())
+
+# Learned corridor support per provider (negative entries and re-probe times)
+@app.route("/api/capabilities")
+def api_capabilities():
+    return jsonify(CAPABILITIES.status())
+
+# Cross-process rate-limit buckets per provider (tokens left, rate, burst)
+@app.route("/api/ratelimit")
+def api_ratelimit():
+    return jsonify(RATE_LIMITER.status())
+
+# Prefetch scheduler: demand weights, per-provider budget, refresh counts
+@app.route("/api/prefetch")
+def api_prefetch():
+    return jsonify(PREFETCHER.status())
+
+# Mid-market reference table used for markup / true cost annotations
+@app.route("/api/reference")
+def api_reference():
+    return jsonify(REFERENCE_RATES.status())
+
+# TapTap rate catalog freshness
+@app.route("/api/taptap")
+def api_taptap():
+    # Imported here so the provider module stays unloaded until first used
+    from .providers.taptap import TAPTAP_CATALOG
+    return jsonify(TAPTAP_CATALOG.status())
+
+# State owned by other modules, read at scrape time
+def _state_metrics():
+    cache = QUOTE_CACHE.stats()
+    for event in ("hit", "stale", "miss", "refresh", "refresh_error"):
+        yield ("arbitragex_cache_events_total", "counter", "Quote cache lookups and background refreshes.", {"event": event}, cache[event])
+    yield ("arbitragex_cache_entries", "gauge", "Entries currently in the quote cache.", {}, cache["size"])
+    for provider, c in PROVIDER_FLIGHTS.stats()["providers"].items():
+        yield ("arbitragex_singleflight_coalesced_total", "counter", "Provider calls that joined an identical in-flight call.", {"provider": provider}, c["coalesced"])
+    for host, c in transport.stats().items():
+        yield ("arbitragex_upstream_connections_total", "counter", "TCP/TLS connections opened per upstream host.", {"host": host}, c["connections"])
+        yield ("arbitragex_upstream_reused_requests_total", "counter", "Upstream requests sent over a warm connection.", {"host": host}, c["reused"])
+    for provider, h in health.status().items():
+        yield ("arbitragex_breaker_open", "gauge", "1 while a provider's circuit breaker is open or half-open.", {"provider": provider}, 0 if h["state"] == "closed" else 1)
+        yield ("arbitragex_provider_timeout_seconds", "gauge", "Current adaptive per-request timeout.", {"provider": provider}, h["timeout"])
+    for provider, b in RATE_LIMITER.status()["providers"].items():
+        yield ("arbitragex_ratelimit_tokens", "gauge", "Rate-limit tokens currently available (shared by all workers).", {"provider": provider}, b["tokens"])
+
+REGISTRY.add_collector(_state_metrics)
+
+# Prometheus scrape endpoint
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 # Vercel ignores this block, but good for local testing
 if __name__ == "__main__":
     app.run(debug=True)
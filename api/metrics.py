@@ -0,0 +1,185 @@
+import contextvars
+import threading
+from bisect import bisect_left
+
+# ==============================================================================
+# BUCKETS
+# ==============================================================================
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# ==============================================================================
+# REGISTRY (Prometheus text exposition, no client library needed)
+# ==============================================================================
+def _label_str(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+def _fmt(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}         # name -> (type, help)
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [bucket counts..., overflow, sum, count]
+        self._buckets = {}      # name -> bucket bounds
+        self._collectors = []
+
+    def counter(self, name, help_text):
+        self._meta[name] = ("counter", help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help_text)
+        self._buckets[name] = tuple(buckets)
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        bounds = self._buckets[name]
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(bounds) + 3)
+            h[bisect_left(bounds, value)] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def add_collector(self, fn):
+        """fn() returns an iterable of (name, type, help, labels, value) read
+        at scrape time, for state owned by other modules (cache size, ...)."""
+        self._collectors.append(fn)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in sorted(self._meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_label_str(labels)} {_fmt(value)}")
+            else:
+                bounds = self._buckets[name]
+                for (n, labels), h in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(bounds, h):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_label_str(labels + (('le', _fmt(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_label_str(labels + (('le', '+Inf'),))} {h[-1]}")
+                    lines.append(f"{name}_sum{_label_str(labels)} {_fmt(h[-2])}")
+                    lines.append(f"{name}_count{_label_str(labels)} {h[-1]}")
+
+        # Samples of one metric must be contiguous in the exposition
+        collected = {}
+        for collect in self._collectors:
+            for name, kind, help_text, labels, value in collect():
+                entry = collected.setdefault(name, (kind, help_text, []))
+                entry[2].append(f"{name}{_label_str(tuple(sorted(labels.items())))} {_fmt(value)}")
+        for name, (kind, help_text, samples) in collected.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REGISTRY.histogram("arbitragex_provider_latency_seconds", "Provider call latency, including cache hits.")
+REGISTRY.counter("arbitragex_provider_calls_total", "Provider calls by outcome (ok, empty, error, circuit_open, rate_limited, unsupported).")
+REGISTRY.counter("arbitragex_provider_quotes_total", "Quotes returned by each provider.")
+REGISTRY.counter("arbitragex_provider_deadline_exceeded_total", "Provider calls still running when the request deadline passed.")
+REGISTRY.counter("arbitragex_provider_hedges_total", "Hedged second attempts fired for provider calls in the latency tail.")
+REGISTRY.histogram("arbitragex_upstream_request_seconds", "Upstream HTTP request latency.")
+REGISTRY.counter("arbitragex_upstream_responses_total", "Upstream HTTP responses by status code.")
+REGISTRY.counter("arbitragex_upstream_errors_total", "Upstream HTTP failures by kind (timeout, connection, parse, other).")
+REGISTRY.histogram("arbitragex_upstream_response_bytes", "Upstream response body size.", buckets=SIZE_BUCKETS)
+REGISTRY.histogram("arbitragex_ratelimit_wait_seconds", "Time provider calls queued for a rate-limit token.")
+REGISTRY.counter("arbitragex_ratelimit_rejected_total", "Provider calls not sent because no rate-limit token came in time.")
+
+# ==============================================================================
+# PER-CALL CONTEXT
+# ==============================================================================
+# The provider whose fetcher is running, plus a tally of its upstream
+# requests. Fetchers swallow their own exceptions, so this tally is how the
+# engine tells "provider has nothing for this corridor" from "upstream failed".
+_current_call = contextvars.ContextVar("arbitragex_provider_call", default=None)
+_call_lock = threading.Lock()
+
+def begin_provider_call(provider):
+    return _current_call.set({"provider": provider, "requests": 0, "errors": 0})
+
+def end_provider_call(token):
+    call = _current_call.get()
+    _current_call.reset(token)
+    return call
+
+def current_provider():
+    call = _current_call.get()
+    return call["provider"] if call else "none"
+
+def record_upstream(host, method, elapsed, status_code=None, size=None, error=None):
+    """error is one of None, "timeout", "connection", "parse", "other".
+
+    A response counts as a failed upstream request when it errored, was
+    rate-limited (429) or was a server error (5xx). Other 4xx are how
+    several providers say "corridor not supported", so they do not count.
+    """
+    provider = current_provider()
+    labels = {"provider": provider, "host": host}
+    if elapsed is not None:
+        REGISTRY.observe("arbitragex_upstream_request_seconds", elapsed, dict(labels, method=method))
+    if status_code is not None:
+        REGISTRY.inc("arbitragex_upstream_responses_total", dict(labels, code=str(status_code)))
+    if size is not None:
+        REGISTRY.observe("arbitragex_upstream_response_bytes", size, labels)
+    if error is not None:
+        REGISTRY.inc("arbitragex_upstream_errors_total", dict(labels, kind=error))
+
+    call = _current_call.get()
+    if call is not None:
+        failed = error is not None or (status_code is not None and (status_code == 429 or status_code >= 500))
+        with _call_lock:
+            if elapsed is not None:
+                call["requests"] += 1
+            if failed:
+                call["errors"] += 1
+
+def record_provider_call(provider, status, elapsed, quotes):
+    labels = {"provider": provider}
+    REGISTRY.observe("arbitragex_provider_latency_seconds", elapsed, dict(labels, status=status))
+    REGISTRY.inc("arbitragex_provider_calls_total", dict(labels, status=status))
+    if quotes:
+        REGISTRY.inc("arbitragex_provider_quotes_total", labels, quotes)
+
+def record_deadline_exceeded(provider):
+    REGISTRY.inc("arbitragex_provider_deadline_exceeded_total", {"provider": provider})
+
+def record_hedge(provider):
+    REGISTRY.inc("arbitragex_provider_hedges_total", {"provider": provider})
+
+def record_ratelimit(provider, waited):
+    """waited is the seconds queued for a token, or None when rejected."""
+    labels = {"provider": provider}
+    if waited is None:
+        REGISTRY.inc("arbitragex_ratelimit_rejected_total", labels)
+    else:
+        REGISTRY.observe("arbitragex_ratelimit_wait_seconds", waited, labels)
@@ -0,0 +1,206 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import transport
+from .cache import QUOTE_CACHE
+from .capabilities import CAPABILITIES
+from .fanout import PROVIDERS, normalize_query, refresh_provider
+from .health import OPEN, health_for
+from .ratelimit import RATELIMIT_DB, RateLimited, RateLimiter
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# The corridors offered in index.html
+SEND_SIDES = [("USD", "US"), ("EUR", "NL"), ("EUR", "FR"), ("GBP", "GB"), ("CAD", "CA")]
+RECEIVE_SIDES = [("MAD", "MA"), ("PHP", "PH"), ("BDT", "BD")]
+CORRIDORS = [(s_curr, r_curr, s_cty, r_cty) for s_curr, s_cty in SEND_SIDES for r_curr, r_cty in RECEIVE_SIDES]
+# Amounts kept warm even before anyone asks (the index.html default)
+DEFAULT_AMOUNTS = [100.0]
+
+# Upstream requests the prefetcher may make per provider per minute, across
+# all worker processes on the machine (shared buckets in the rate-limit DB)
+BUDGET_PER_MINUTE = float(os.environ.get("ARBITRAGEX_PREFETCH_BUDGET", 30))
+# Most upstream requests one provider call makes (Sendwave: segments plus
+# one per payout method; WorldRemit: one per payout method), before the
+# transport's retries. Reserved up front; what a call did not use is refunded.
+UPSTREAM_REQUESTS = {"Sendwave": 4, "WorldRemit": 2}
+TICK = 1.0
+WORKERS = 4
+# Demand is an exponentially decayed request count per (corridor, amount)
+DEMAND_HALF_LIFE = 600.0
+# Pairs at or above this demand are refreshed before every TTL expiry;
+# colder pairs proportionally less often.
+HOT_DEMAND = 5.0
+BASELINE_DEMAND = 0.5
+# Demand decayed below this is forgotten (and floors the hotness divisor)
+MIN_DEMAND = 0.01
+REFRESH_AT = 0.8
+MAX_TRACKED = 300
+
+# ==============================================================================
+# SCHEDULER
+# ==============================================================================
+class PrefetchScheduler:
+    """Keeps the quote cache warm for the offered corridors.
+
+    Each (provider, corridor, amount) is refreshed once its cached entry is
+    REFRESH_AT x TTL old, scaled up for pairs with little demand. Hotter pairs
+    go first. Each provider has a token bucket of BUDGET_PER_MINUTE upstream
+    requests shared by every worker process: a call reserves its worst case
+    and is refunded whatever the transport did not send, so prefetching can
+    never exceed its upstream budget.
+    """
+
+    def __init__(self, corridors=CORRIDORS, amounts=DEFAULT_AMOUNTS, budget_per_minute=BUDGET_PER_MINUTE, tick=TICK,
+                 budget_path=RATELIMIT_DB):
+        self.corridors = {tuple(c) for c in corridors}
+        self.budget_per_minute = budget_per_minute
+        self.tick_interval = tick
+        self._lock = threading.Lock()
+        self._demand = {}       # query -> (score, updated_at)
+        self._baseline = [normalize_query(a, *c) for c in corridors for a in amounts]
+        # Fails closed: without the shared buckets there is no budget to spend
+        self._budget = RateLimiter(
+            path=budget_path,
+            limits={f"prefetch:{name}": (budget_per_minute / 60.0, budget_per_minute) for name, _ in PROVIDERS if budget_per_minute > 0},
+            fail_open=False,
+        )
+        self._in_flight = set()
+        self._pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="arbx-prefetch")
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {"scheduled": 0, "refreshed": 0, "failed": 0, "over_budget": 0}
+
+    # --- demand -------------------------------------------------------------
+    @staticmethod
+    def _decayed(score, updated_at, now):
+        return score * math.exp(-(now - updated_at) * math.log(2) / DEMAND_HALF_LIFE)
+
+    def record_demand(self, query):
+        if query[1:] not in self.corridors:
+            return
+        now = time.time()
+        with self._lock:
+            score, updated_at = self._demand.get(query, (0.0, now))
+            self._demand[query] = (self._decayed(score, updated_at, now) + 1.0, now)
+            if len(self._demand) > MAX_TRACKED:
+                coldest = min(self._demand, key=lambda q: self._decayed(*self._demand[q], now))
+                del self._demand[coldest]
+
+    def weights(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            weights = {q: self._decayed(s, t, now) for q, (s, t) in self._demand.items()}
+            for q in [q for q, w in weights.items() if w < MIN_DEMAND]:
+                del self._demand[q], weights[q]
+        for q in self._baseline:
+            weights[q] = max(weights.get(q, 0.0), BASELINE_DEMAND)
+        return weights
+
+    # --- budget -------------------------------------------------------------
+    def _take_tokens(self, provider):
+        """Reserves the most upstream requests one call to `provider` can
+        make; returns how many, or 0 when the budget is spent."""
+        if self.budget_per_minute <= 0:
+            return 0
+        cost = UPSTREAM_REQUESTS.get(provider, 1) * (1 + transport.RETRIES)
+        try:
+            self._budget.acquire(f"prefetch:{provider}", max_wait=0, cost=cost)
+        except RateLimited:
+            return 0
+        return cost
+
+    # --- planning -----------------------------------------------------------
+    def due(self, now=None):
+        """(weight, provider, query) pairs whose cache entry needs refreshing,
+        hottest first."""
+        now = now or time.time()
+        out = []
+        for query, weight in self.weights(now).items():
+            hotness = min(max(weight, MIN_DEMAND) / HOT_DEMAND, 1.0)
+            for name, _ in PROVIDERS:
+                key = (name,) + query
+                _, age = QUOTE_CACHE.peek(key)
+                refresh_after = QUOTE_CACHE.ttl_for(key) * REFRESH_AT / hotness
+                if age is None or age >= refresh_after:
+                    out.append((weight, name, query))
+        out.sort(key=lambda item: -item[0])
+        return out
+
+    def tick(self):
+        now = time.time()
+        for weight, name, query in self.due(now):
+            key = (name,) + query
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+            if health_for(name).state == OPEN:
+                continue
+            # Unsupported corridors cost no budget; an expired entry is let
+            # through once, so prefetching doubles as the periodic re-probe.
+            if not CAPABILITIES.allows(name, query):
+                continue
+            reserved = self._take_tokens(name)
+            if not reserved:
+                self.counters["over_budget"] += 1
+                continue
+            with self._lock:
+                self._in_flight.add(key)
+            self.counters["scheduled"] += 1
+            self._pool.submit(self._refresh, name, query, reserved)
+
+    def _refresh(self, name, query, reserved):
+        sent = []
+        tally = transport.request_tally.set(sent)
+        try:
+            refresh_provider(name, query)
+            self.counters["refreshed"] += 1
+        except Exception:
+            self.counters["failed"] += 1
+        finally:
+            transport.request_tally.reset(tally)
+            self._budget.refund(f"prefetch:{name}", reserved - len(sent))
+            with self._lock:
+                self._in_flight.discard((name,) + query)
+
+    # --- lifecycle ----------------------------------------------------------
+    def _loop(self):
+        while not self._stop.wait(self.tick_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Prefetch tick failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="arbx-prefetch-loop", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        now = time.time()
+        top = sorted(self.weights(now).items(), key=lambda item: -item[1])[:20]
+        with self._lock:
+            in_flight = len(self._in_flight)
+        budget = self._budget.status()
+        tokens = {p.split(":", 1)[1]: b["tokens"] for p, b in budget["providers"].items()}
+        return {
+            "running": self._thread is not None and not self._stop.is_set(),
+            "budget_per_minute": self.budget_per_minute,
+            "tokens": tokens,
+            "in_flight": in_flight,
+            "counters": dict(self.counters),
+            "top_demand": [
+                {"amount": q[0], "sendCurr": q[1], "recvCurr": q[2], "sendCty": q[3], "recvCty": q[4], "weight": round(w, 3)}
+                for q, w in top
+            ],
+        }
+
+PREFETCHER = PrefetchScheduler()
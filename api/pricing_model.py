@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# Observations older than this no longer describe the current schedule
+MAX_AGE = float(os.environ.get("ARBITRAGEX_MODEL_MAX_AGE", 900))
+AMOUNTS_PER_SERIES = 64
+# Two neighbouring amounts are in the same tier when fee and rate match
+FEE_TOL = 0.005
+RATE_TOL = 1e-4
+
+# ==============================================================================
+# SEGMENTS
+# ==============================================================================
+class Segment:
+    """A run of observed amounts with one rate and one fee (a pricing tier).
+
+    recipient_gets is fitted as a*amount + b: rate*(amount - fee) for
+    deducted fees, rate*amount for fees charged on top.
+    """
+
+    def __init__(self, points):
+        self.points = points                    # [(amount, rate, fee, recipient_gets)]
+        self.lo = points[0][0]
+        self.hi = points[-1][0]
+        self.rate = points[-1][1]
+        self.fee = points[-1][2]
+        if len(points) >= 2:
+            xs = [p[0] for p in points]
+            ys = [p[3] for p in points]
+            mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+            sxx = sum((x - mx) ** 2 for x in xs)
+            self.a = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx if sxx else self.rate
+            self.b = my - self.a * mx
+        else:
+            amount, rate, fee, recipient_gets = points[0]
+            deducted = max(amount - recipient_gets / rate, 0.0) if rate else 0.0
+            self.a, self.b = rate, -rate * deducted
+        self.residual = max(abs(self.a * p[0] + self.b - p[3]) for p in points)
+
+    def predict(self, amount):
+        return self.a * amount + self.b
+
+    def bound(self, amount):
+        # Fit error plus the rate rounding providers apply
+        return self.residual + abs(amount * self.rate * RATE_TOL) + 0.01
+
+def _segments(points):
+    segments, run = [], [points[0]]
+    for p in points[1:]:
+        prev = run[-1]
+        same_fee = abs(p[2] - prev[2]) <= FEE_TOL
+        same_rate = abs(p[1] - prev[1]) <= RATE_TOL * max(abs(prev[1]), 1e-9)
+        if same_fee and same_rate:
+            run.append(p)
+        else:
+            segments.append(Segment(run))
+            run = [p]
+    segments.append(Segment(run))
+    return segments
+
+# ==============================================================================
+# MODEL
+# ==============================================================================
+class PricingModel:
+    """Per provider, category and corridor piecewise model of rate, fee and
+    recipient_gets over the send amount, built from observed quotes.
+
+    Only amounts inside the observed range are answered. Inside a tier the
+    prediction comes from that tier's fit. Between two tiers the breakpoint
+    is unknown, so the nearer tier answers and the bound covers the
+    disagreement between the two.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}       # (provider, category, corridor) -> {amount: (rate, fee, recipient_gets, observed_at)}
+        self._fitted = {}       # same key -> (amounts_lo, segments, fitted_at)
+
+    def observe(self, provider_name, query, quotes):
+        """Quote listener."""
+        amount, send_curr, recv_curr, send_cty, recv_cty = query
+        corridor = (send_curr, recv_curr, send_cty, recv_cty)
+        now = time.time()
+        with self._lock:
+            for q in quotes:
+                if q.get("rate", 0) <= 0:
+                    continue
+                key = (q["provider"], q["category"], corridor)
+                series = self._series.setdefault(key, {})
+                series[amount] = (q["rate"], q["fee"], q["recipient_gets"], now)
+                if len(series) > AMOUNTS_PER_SERIES:
+                    del series[min(series, key=lambda a: series[a][3])]
+                self._fitted.pop(key, None)
+
+    def _fit(self, key, now):
+        fitted = self._fitted.get(key)
+        if fitted is not None and now - fitted[2] < 1.0:
+            return fitted
+        series = self._series.get(key, {})
+        points = sorted(
+            (amount, o[0], o[1], o[2]) for amount, o in series.items() if now - o[3] <= MAX_AGE
+        )
+        if not points:
+            self._fitted.pop(key, None)
+            return None
+        segments = _segments(points)
+        fitted = self._fitted[key] = ([s.lo for s in segments], segments, now)
+        return fitted
+
+    def predict(self, provider, category, corridor, amount):
+        now = time.time()
+        with self._lock:
+            fitted = self._fit((provider, category, corridor), now)
+        if fitted is None:
+            return None
+        los, segments, _ = fitted
+        if amount < segments[0].lo or amount > segments[-1].hi:
+            return None
+
+        i = bisect_right(los, amount) - 1
+        seg = segments[i]
+        if amount <= seg.hi:
+            value, bound, tier_gap = seg.predict(amount), seg.bound(amount), False
+        else:
+            nxt = segments[i + 1]
+            near = seg if amount - seg.hi <= nxt.lo - amount else nxt
+            value = near.predict(amount)
+            bound = abs(seg.predict(amount) - nxt.predict(amount)) + max(seg.bound(amount), nxt.bound(amount))
+            seg, tier_gap = near, True
+
+        return {
+            "provider": provider,
+            "category": category,
+            "rate": seg.rate,
+            "fee": seg.fee,
+            "recipient_gets": round(value, 2),
+            "estimate": True,
+            "error_bound": round(bound, 2),
+            "tier_gap": tier_gap,
+        }
+
+    def estimate_quotes(self, amount, send_curr, recv_curr, send_cty, recv_cty):
+        corridor = (send_curr.upper(), recv_curr.upper(), send_cty.upper(), recv_cty.upper())
+        with self._lock:
+            keys = [k for k in self._series if k[2] == corridor]
+        quotes = []
+        for provider, category, _ in keys:
+            q = self.predict(provider, category, corridor, float(amount))
+            if q is not None:
+                quotes.append(q)
+        return quotes
+
+    def describe(self, send_curr, recv_curr, send_cty, recv_cty):
+        """Detected tiers and breakpoint intervals per provider/category."""
+        corridor = (send_curr.upper(), recv_curr.upper(), send_cty.upper(), recv_cty.upper())
+        now = time.time()
+        out = []
+        with self._lock:
+            keys = [k for k in self._series if k[2] == corridor]
+            for key in keys:
+                fitted = self._fit(key, now)
+                if fitted is None:
+                    continue
+                segments = fitted[1]
+                out.append({
+                    "provider": key[0],
+                    "category": key[1],
+                    "tiers": [
+                        {"from": s.lo, "to": s.hi, "rate": s.rate, "fee": s.fee, "points": len(s.points)}
+                        for s in segments
+                    ],
+                    # Each breakpoint lies somewhere inside this open interval
+                    "breakpoints": [[a.hi, b.lo] for a, b in zip(segments, segments[1:])],
+                })
+        return out
+
+PRICING_MODEL = PricingModel()
@@ -0,0 +1,52 @@
+import importlib
+import threading
+
+# ==============================================================================
+# REGISTRY
+# ==============================================================================
+# Display name -> (module in this package, fetcher function), in the order
+# results are listed. Nothing is imported until a provider is first called,
+# so importing the registry (and the app) stays cheap on a cold start.
+REGISTRY = [
+    ("Remitly", "remitly", "get_remitly_quote"),
+    ("TapTap Send", "taptap", "get_taptap_quote"),
+    ("Wise", "wise", "get_wise_quote"),
+    ("Western Union", "westernunion", "get_westernunion_quote"),
+    ("WorldRemit", "worldremit", "get_worldremit_quote"),
+    ("Sendwave", "sendwave", "get_sendwave_quote"),
+]
+
+_lock = threading.Lock()
+
+class LazyFetcher:
+    """Callable stand-in for a provider fetcher; imports its module on the
+    first call."""
+
+    def __init__(self, module, function):
+        self.module = module
+        self.function = function
+        self._fn = None
+
+    @property
+    def loaded(self):
+        return self._fn is not None
+
+    def resolve(self):
+        if self._fn is None:
+            with _lock:
+                if self._fn is None:
+                    module = importlib.import_module(f"{__name__}.{self.module}")
+                    self._fn = getattr(module, self.function)
+        return self._fn
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyFetcher {self.module}.{self.function}{'' if self.loaded else ' (not loaded)'}>"
+
+PROVIDERS = [(name, LazyFetcher(module, function)) for name, module, function in REGISTRY]
+
+def loaded():
+    """Names of the providers whose modules have been imported."""
+    return [name for name, fetcher in PROVIDERS if fetcher.loaded]
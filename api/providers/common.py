@@ -0,0 +1,25 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Sub-requests inside a single provider (Sendwave segments, WorldRemit payout
+# methods) run on their own pool so they never queue behind whole-provider tasks.
+_SUBREQUEST_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="arbx-sub")
+
+def map_concurrent(fn, items):
+    # Each item runs in a copy of the caller's context, so per-provider
+    # instrumentation follows the sub-requests onto the pool threads.
+    futures = [_SUBREQUEST_POOL.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [f.result() for f in futures]
+
+# ==============================================================================
+# HELPER: ISO-2 to ISO-3 CONVERSION
+# ==============================================================================
+ISO3 = {
+    'US': 'USA', 'PH': 'PHL', 'MA': 'MAR', 'FR': 'FRA', 
+    'BD': 'BGD', 'SN': 'SEN', 'ES': 'ESP', 'IT': 'ITA',
+    'GB': 'GBR', 'DE': 'DEU', 'CA': 'CAN', 'AU': 'AUS',
+    'TR': 'TUR', 'VN': 'VNM', 'BE': 'BEL'
+}
+
+def get_iso3(iso2):
+    return ISO3.get(iso2.upper(), iso2.upper())
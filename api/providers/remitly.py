@@ -0,0 +1,41 @@
+from .. import transport
+from ..capabilities import mark_unsupported
+from .common import ISO3, get_iso3
+
+# ==============================================================================
+# REMITLY (Dynamic Category)
+# ==============================================================================
+def get_remitly_quote(amount, send_curr, receive_curr, send_country, receive_country):
+    # Remitly conduits need ISO-3 codes; without one the request cannot be built
+    for country in (send_country, receive_country):
+        if country.upper() not in ISO3:
+            mark_unsupported(f"no ISO-3 code for {country.upper()}")
+            return None
+    s_iso3, r_iso3 = get_iso3(send_country), get_iso3(receive_country)
+    conduit = f"{s_iso3}:{send_curr.upper()}-{r_iso3}:{receive_curr.upper()}"
+    url = "https://api.remitly.io/v3/calculator/estimate"
+    params = {'conduit': conduit, 'anchor': 'SEND', 'amount': amount, 'purpose': 'OTHER', 'customer_segment': 'UNRECOGNIZED', 'strict_promo': 'false'}
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    try:
+        response = transport.get(url, params=params, headers=headers, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            best_opt = None
+            if "pay_out_price_estimates" in data:
+                for est in data["pay_out_price_estimates"].get("estimates", []):
+                    try:
+                        rec_amt = float(est.get("receive_amount", 0))
+                        if best_opt is None or rec_amt > best_opt["recipient_gets"]:
+                            exch = est.get("exchange_rate", {})
+                            rate = float(exch.get("promotional_exchange_rate") or exch.get("base_rate"))
+                            best_opt = {
+                                "provider": "Remitly",
+                                "category": "Retrait en Espèces", 
+                                "rate": rate,
+                                "fee": float(est.get("fee", {}).get("total_fee_amount", 0)),
+                                "recipient_gets": rec_amt
+                            }
+                    except: continue
+            return best_opt
+    except: return None
+    return None
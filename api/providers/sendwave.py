@@ -0,0 +1,98 @@
+from .. import transport
+from ..capabilities import mark_unsupported
+from .common import map_concurrent
+
+# ==============================================================================
+# SENDWAVE (Advanced: Dynamic "bestPricedSegmentName")
+# ==============================================================================
+def get_sendwave_quote(amount, send_curr, receive_curr, send_country, receive_country):
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Referer': 'https://www.sendwave.com/',
+        'Origin': 'https://www.sendwave.com',
+        'Accept': 'application/json'
+    }
+
+    # 1. Request Segments Info
+    segments_url = "https://app.sendwave.com/v2/pricing-segments"
+    params_seg = {
+        'sendCountryIso2': send_country.lower(),
+        'sendCurrency': send_curr,
+        'receiveCountryIso2': receive_country.lower(),
+        'receiveCurrency': receive_curr
+    }
+    
+    results = []
+    
+    try:
+        resp_seg = transport.get(segments_url, params=params_seg, headers=headers, timeout=10)
+        
+        if resp_seg.status_code == 200:
+            data = resp_seg.json()
+            
+            # 2. Extract bestPricedSegmentName from payoutMethodsAndPrices
+            # We look for "Cash Pickup" and "Bank Account" labels
+            payout_methods = data.get("payoutMethodsAndPrices", [])
+            
+            segments_to_check = []
+            
+            for method in payout_methods:
+                label = method.get("label", "")
+                best_segment = method.get("bestPricedSegmentName")
+                
+                if not best_segment: continue
+
+                if "Cash Pickup" in label:
+                    segments_to_check.append({"segment": best_segment, "cat": "Retrait en Espèces"})
+                elif "Bank Account" in label:
+                    segments_to_check.append({"segment": best_segment, "cat": "Dépôt Bancaire"})
+                elif "Wallet" in label or "Mobile" in label:
+                    segments_to_check.append({"segment": best_segment, "cat": "Retrait en Espèces"}) # Wallet -> Cash group
+
+            if not segments_to_check:
+                mark_unsupported("no pricing segments")
+
+            # 3. Fetch Pricing for these specific segments
+            pricing_url = "https://app.sendwave.com/v2/pricing-public"
+            
+            def fetch_segment(item):
+                params_quote = {
+                    'amountType': 'SEND',
+                    'receiveCurrency': receive_curr,
+                    'segmentName': item['segment'],
+                    'amount': amount,
+                    'sendCurrency': send_curr,
+                    'sendCountryIso2': send_country.lower(),
+                    'receiveCountryIso2': receive_country.lower()
+                }
+                
+                try:
+                    resp_quote = transport.get(pricing_url, params=params_quote, headers=headers, timeout=5)
+                    if resp_quote.status_code == 200:
+                        q_data = resp_quote.json()
+                        if "effectiveExchangeRate" in q_data:
+                            return {
+                                "provider": "Sendwave",
+                                "category": item['cat'],
+                                "rate": float(q_data["effectiveExchangeRate"]),
+                                "fee": float(q_data["effectiveFeeAmount"]),
+                                "recipient_gets": float(q_data["receiveAmount"])
+                            }
+                except: return None
+                return None
+
+            # All segments are priced at the same time
+            results = [q for q in map_concurrent(fetch_segment, segments_to_check) if q]
+
+            # Filter: Best quote per category
+            final_quotes = []
+            for cat in ["Dépôt Bancaire", "Retrait en Espèces"]:
+                cat_options = [q for q in results if q['category'] == cat]
+                if cat_options:
+                    best = max(cat_options, key=lambda x: x['recipient_gets'])
+                    final_quotes.append(best)
+            
+            return final_quotes if final_quotes else None
+
+    except: return None
+    return None
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+from .. import transport
+from ..reference_rates import REFERENCE_RATES
+
+# ==============================================================================
+# TAPTAP SEND (Category: Retrait Espèces)
+# ==============================================================================
+TAPTAP_FEES = {"US": {"MA": 2.99, "PH": 2.99}, "CA": {"MA": 2.50}, "FR": {"MA": 2.99}}
+TAPTAP_RATES_URL = "https://api.taptapsend.com/api/fxRates"
+TAPTAP_SNAPSHOT = "taptap_data.json"
+
+class TapTapCatalog:
+    """TapTap publishes every corridor in one fxRates document. It is
+    downloaded at most once per refresh interval and indexed by
+    (send country, receive country, receive currency)."""
+
+    def __init__(self, url=TAPTAP_RATES_URL, snapshot_path=TAPTAP_SNAPSHOT, refresh_interval=300, retry_interval=30):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.refreshed_at = None     # time of the last successful download
+        self._rates = {}
+        self._snapshot = {}
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+
+        # The on-disk snapshot is only a fallback, read once at startup
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, "r") as f:
+                    self._snapshot = self._index(json.load(f))
+            except: pass
+
+    @staticmethod
+    def _index(data):
+        rates = {}
+        for country in data.get("availableCountries", []):
+            send = country.get("isoCountryCode")
+            for corridor in country.get("corridors", []):
+                try:
+                    rate = float(corridor.get("fxRate", 0))
+                except: continue
+                key = (send, corridor.get("isoCountryCode"), corridor.get("currency"))
+                if rate > 0 and key not in rates:
+                    rates[key] = rate
+        return rates
+
+    def refresh(self, force=False):
+        if not force and time.time() < self._next_refresh:
+            return
+        # Only one thread downloads; the others keep using the current index
+        # unless there is nothing to serve yet.
+        if not self._lock.acquire(blocking=not self._rates):
+            return
+        try:
+            if not force and time.time() < self._next_refresh:
+                return
+            # The caller's timeout cap is learned from in-memory lookups and
+            # is far too tight for this document; it keeps its own timeout
+            cap = transport.timeout_cap.set(None)
+            try:
+                response = transport.get(self.url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
+                if response.status_code == 200:
+                    rates = self._index(response.json())
+                    if rates:
+                        self._rates = rates
+                        self.refreshed_at = time.time()
+                        self._next_refresh = self.refreshed_at + self.refresh_interval
+                        return
+            except: pass
+            finally:
+                transport.timeout_cap.reset(cap)
+            self._next_refresh = time.time() + self.retry_interval
+        finally:
+            self._lock.release()
+
+    def lookup(self, send_country, receive_country, receive_curr):
+        self.refresh()
+        key = (send_country.upper(), receive_country.upper(), receive_curr.upper())
+        return self._rates.get(key) or self._snapshot.get(key, 0.0)
+
+    def status(self):
+        return {
+            "corridors": len(self._rates),
+            "snapshot_corridors": len(self._snapshot),
+            "refreshed_at": self.refreshed_at,
+            "refresh_interval": self.refresh_interval,
+        }
+
+TAPTAP_CATALOG = TapTapCatalog()
+
+def get_taptap_quote(amount, send_curr, receive_curr, send_country, receive_country):
+    fee = TAPTAP_FEES.get(send_country.upper(), {}).get(receive_country.upper(), 0.0)
+    rate = TAPTAP_CATALOG.lookup(send_country, receive_country, receive_curr)
+    
+    # Corridor missing from the catalog: fall back to the mid-market rate
+    if rate == 0:
+        rate = REFERENCE_RATES.rate(send_curr, receive_curr, wait=True) or 0.0
+
+    if rate > 0:
+        return {"provider": "TapTap Send", "category": "Retrait en Espèces", "rate": rate, "fee": fee, "recipient_gets": amount * rate}
+    return None
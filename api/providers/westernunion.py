@@ -0,0 +1,70 @@
+from .. import transport
+from ..capabilities import mark_unsupported
+
+# ==============================================================================
+# WESTERN UNION (Robust Service Name Categorization)
+# ==============================================================================
+def get_westernunion_quote(amount, send_curr, receive_curr, send_country, receive_country):
+    url = "https://www.westernunion.com/wuconnect/prices/catalog"
+    payload = {
+        "header_request": {"version": "0.5", "request_type": "PRICECATALOG"},
+        "sender": {
+            "client": "WUCOM", "channel": "WWEB", "funds_in": "*",
+            "curr_iso3": send_curr.upper(), "cty_iso2_ext": send_country.upper(),
+            "send_amount": str(amount)
+        },
+        "receiver": {
+            "curr_iso3": receive_curr.upper(),
+            "cty_iso2_ext": receive_country.upper(),
+            "cty_iso2": receive_country.upper()
+        }
+    }
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'Mozilla/5.0'}
+    
+    results = []
+    
+    try:
+        response = transport.post(url, json=payload, headers=headers, timeout=15)
+        if response.status_code == 200:
+            data = response.json()
+            if not data.get("services_groups"):
+                mark_unsupported("no services_groups in price catalog")
+            
+            if "services_groups" in data and isinstance(data["services_groups"], list):
+                for group in data["services_groups"]:
+                    service_name = group.get("service_name", "").upper()
+                    
+                    category = "Autre"
+                    if "BANK" in service_name or "DIRECT" in service_name:
+                        category = "Dépôt Bancaire"
+                    elif "MINUTES" in service_name or "CASH" in service_name:
+                        category = "Retrait en Espèces"
+                    elif "MOBILE" in service_name:
+                        category = "Retrait en Espèces"
+                    else:
+                        continue 
+
+                    if "pay_groups" in group:
+                        for pay in group["pay_groups"]:
+                            try:
+                                rec_amt = float(pay.get("receive_amount", 0))
+                                results.append({
+                                    "provider": "Western Union",
+                                    "category": category,
+                                    "rate": float(pay.get("fx_rate", 0)),
+                                    "fee": float(pay.get("base_fee", 0)),
+                                    "recipient_gets": rec_amt
+                                })
+                            except: continue
+            
+            final_quotes = []
+            for cat in ["Dépôt Bancaire", "Retrait en Espèces"]:
+                cat_options = [q for q in results if q['category'] == cat]
+                if cat_options:
+                    best = max(cat_options, key=lambda x: x['recipient_gets'])
+                    final_quotes.append(best)
+            
+            return final_quotes if final_quotes else None
+
+    except: return None
+    return None
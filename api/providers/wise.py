@@ -0,0 +1,30 @@
+from .. import transport
+
+# ==============================================================================
+# WISE (Category: Dépôt Bancaire)
+# ==============================================================================
+def get_wise_quote(amount, send_curr, receive_curr, send_country, receive_country=None):
+    url = "https://wise.com/gateway/v4/comparisons"
+    params = {
+        'sendAmount': amount, 'sourceCurrency': send_curr, 'targetCurrency': receive_curr,
+        'sourceCountry': send_country, 'filter': 'POPULAR', 'includeWise': 'true', 'payInMethod': 'DIRECT_DEBIT' 
+    }
+    headers = {'User-Agent': 'Mozilla/5.0', 'Origin': 'https://wise.com'}
+    try:
+        response = transport.get(url, params=params, headers=headers, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            if "providers" in data:
+                for provider in data["providers"]:
+                    if provider.get("alias") == "wise":
+                        if "quotes" in provider and len(provider["quotes"]) > 0:
+                            quote = provider["quotes"][0]
+                            return {
+                                "provider": "Wise",
+                                "category": "Dépôt Bancaire",
+                                "rate": float(quote.get("rate", 0)),
+                                "fee": float(quote.get("fee", 0)),
+                                "recipient_gets": float(quote.get("receivedAmount", 0))
+                            }
+    except: return None
+    return None
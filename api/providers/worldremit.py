@@ -0,0 +1,46 @@
+from .. import transport
+from ..capabilities import mark_unsupported
+from .common import map_concurrent
+
+# ==============================================================================
+# WORLDREMIT (Split Category)
+# ==============================================================================
+def get_worldremit_quote(amount, send_curr, receive_curr, send_country, receive_country):
+    url = "https://api.worldremit.com/graphql"
+    methods = ["CSH", "BNK"] 
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'Mozilla/5.0', 'Origin': 'https://www.worldremit.com'}
+    query = """mutation createCalculation($amount: BigDecimal!, $type: CalculationType!, $sendCountryCode: CountryCode!, $sendCurrencyCode: CurrencyCode!, $receiveCountryCode: CountryCode!, $receiveCurrencyCode: CurrencyCode!, $payOutMethodCode: String, $correspondentId: String) { createCalculation(calculationInput: {amount: $amount, send: {country: $sendCountryCode, currency: $sendCurrencyCode}, type: $type, receive: {country: $receiveCountryCode, currency: $receiveCurrencyCode}, payOutMethodCode: $payOutMethodCode, correspondentId: $correspondentId}) { calculation { id informativeSummary { fee { value { amount currency } } } receive { amount currency } exchangeRate { value } } errors { message } } }"""
+    
+    rejected = []
+
+    def fetch_method(method):
+        variables = {"amount": amount, "type": "SEND", "sendCountryCode": send_country.upper(), "sendCurrencyCode": send_curr.upper(), "receiveCountryCode": receive_country.upper(), "receiveCurrencyCode": receive_curr.upper(), "payOutMethodCode": method, "correspondentId": None}
+        try:
+            response = transport.post(url, json={'query': query, 'variables': variables}, headers=headers, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                errors = data.get("data", {}).get("createCalculation", {}).get("errors", [])
+                if errors:
+                    rejected.append(method)
+                    return None
+
+                calc = data.get("data", {}).get("createCalculation", {}).get("calculation")
+                if calc:
+                    # Determine Category
+                    cat = "Dépôt Bancaire" if method == "BNK" else "Retrait en Espèces"
+                    return {
+                        "provider": f"WorldRemit ({method})",
+                        "category": cat,
+                        "rate": float(calc.get("exchangeRate", {}).get("value", 0)),
+                        "fee": float(calc.get("informativeSummary", {}).get("fee", {}).get("value", {}).get("amount", 0)),
+                        "recipient_gets": float(calc.get("receive", {}).get("amount", 0))
+                    }
+        except: return None
+        return None
+
+    # CSH and BNK are calculated at the same time
+    results = [q for q in map_concurrent(fetch_method, methods) if q]
+    # Every payout method refused the calculation: the corridor is not served
+    if len(rejected) == len(methods):
+        mark_unsupported("calculation errors for every payout method")
+    return results if results else None
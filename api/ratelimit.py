@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+import time
+
+from . import metrics
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# Shared by every worker process on the machine (/tmp is also the only
+# writable location on Vercel, where each instance simply gets its own).
+RATELIMIT_DB = os.environ.get("ARBITRAGEX_RATELIMIT_DB", "/tmp/arbitragex-ratelimit.sqlite")
+# How long an interactive caller may queue for a token before giving up
+# and falling back to whatever the quote cache still holds.
+MAX_WAIT = float(os.environ.get("ARBITRAGEX_RATELIMIT_MAX_WAIT", 0.5))
+# Shortest time a caller waits for the database lock (max_wait=0 callers
+# still need a moment while another worker holds it)
+MIN_LOCK_WAIT = 0.01
+
+# Provider calls per second and burst size, per machine. One provider call
+# may be several upstream requests (Sendwave segments, WorldRemit methods).
+# TapTap is absent: its catalog is downloaded at most every few minutes.
+DEFAULT_LIMITS = {
+    "Remitly": (5.0, 10),
+    "Wise": (5.0, 10),
+    "Western Union": (2.0, 5),
+    "WorldRemit": (3.0, 6),
+    "Sendwave": (3.0, 6),
+}
+
+def _parse_limits(spec):
+    """"Wise=5:10,Western Union=2:4" -> {"Wise": (5.0, 10), ...}. A rate of 0
+    removes the limit for that provider."""
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        rate = float(rate)
+        limits[name.strip()] = (rate, int(burst) if burst else max(int(rate), 1)) if rate > 0 else None
+    return limits
+
+LIMITS = dict(DEFAULT_LIMITS, **_parse_limits(os.environ.get("ARBITRAGEX_RATE_LIMITS", "")))
+
+class RateLimited(Exception):
+    """No token within the caller's wait budget; nothing was sent upstream."""
+
+# ==============================================================================
+# LIMITER
+# ==============================================================================
+class RateLimiter:
+    """Per-provider token buckets kept in a SQLite file, so all worker
+    processes on the host draw from the same buckets.
+
+    Each acquire is one short BEGIN IMMEDIATE transaction (a write lock
+    across processes): refill, then reserve a token. Tokens may go negative
+    for callers that agreed to wait, so queued callers are served in order
+    of reservation. Time spent waiting for the lock counts against the
+    caller's max_wait; a caller that cannot get it in time goes ahead
+    without a token. If the database cannot be used at all the limiter
+    fails open.
+    """
+
+    def __init__(self, path=RATELIMIT_DB, limits=None, fail_open=True):
+        self.path = path
+        self.limits = {k: v for k, v in (LIMITS if limits is None else limits).items() if v}
+        # False for budgets that must hold: no database, no tokens
+        self.fail_open = fail_open
+        self._local = threading.local()
+        self._broken = False
+        self.lock_timeouts = 0
+
+    def _conn(self, lock_wait):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=lock_wait, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (provider TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+            self._local.conn = conn
+            self._local.lock_wait = lock_wait
+        elif self._local.lock_wait != lock_wait:
+            conn.execute(f"PRAGMA busy_timeout = {int(lock_wait * 1000)}")
+            self._local.lock_wait = lock_wait
+        return conn
+
+    def _reserve(self, provider, rate, burst, max_wait, cost=1.0, force=False):
+        """Returns the wait before the reserved tokens may be used, or None
+        (nothing reserved) if that wait would exceed max_wait. force=True
+        books `cost` whatever the wait (a negative cost gives tokens back)."""
+        started = time.monotonic()
+        conn = self._conn(max(max_wait, MIN_LOCK_WAIT))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE provider = ?", (provider,)).fetchone()
+            tokens = float(burst) if row is None else min(float(burst), row[0] + (now - row[1]) * rate)
+            wait = max(0.0, (min(cost, float(burst)) - tokens) / rate)
+            # The time spent waiting for the lock is part of the budget
+            if force or wait <= max(max_wait - (time.monotonic() - started), 0.0):
+                tokens = min(float(burst), tokens - cost)
+            else:
+                wait = None
+            conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated_at) VALUES (?, ?, ?)", (provider, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, provider, max_wait=MAX_WAIT, cost=1):
+        """Blocks until `provider` may be called (at most max_wait seconds),
+        or raises RateLimited. Returns the seconds waited. `cost` tokens are
+        taken at once; refund() returns the ones a call did not use."""
+        limit = self.limits.get(provider)
+        if limit is None:
+            return 0.0
+        if self._broken:
+            return self._unavailable(provider)
+        try:
+            wait = self._reserve(provider, limit[0], limit[1], max_wait, float(cost))
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                self._broken = True
+                print(f"Rate limiter disabled ({self.path}): {e}")
+                return self._unavailable(provider)
+            # Other workers held the lock past our budget: let this call
+            # through rather than make it wait longer than it agreed to
+            self.lock_timeouts += 1
+            return self._unavailable(provider)
+        except sqlite3.Error as e:
+            self._broken = True
+            print(f"Rate limiter disabled ({self.path}): {e}")
+            return self._unavailable(provider)
+        if wait is None:
+            metrics.record_ratelimit(provider, None)
+            raise RateLimited(f"{provider} skipped: rate limit reached")
+        if wait > 0:
+            time.sleep(wait)
+        metrics.record_ratelimit(provider, wait)
+        return wait
+
+    def _unavailable(self, provider):
+        if self.fail_open:
+            return 0.0
+        raise RateLimited(f"{provider} skipped: rate limiter unavailable")
+
+    def refund(self, provider, tokens):
+        """Gives back reserved tokens a call did not use (never above burst);
+        a negative count books what it used beyond its reservation."""
+        limit = self.limits.get(provider)
+        if limit is None or not tokens or self._broken:
+            return
+        try:
+            self._reserve(provider, limit[0], limit[1], MAX_WAIT, -float(tokens), force=True)
+        except sqlite3.Error as e:
+            print(f"Rate limiter refund failed ({self.path}): {e}")
+
+    def status(self):
+        out = {}
+        now = time.time()
+        rows = {}
+        if not self._broken:
+            try:
+                rows = {p: (t, u) for p, t, u in self._conn(max(MAX_WAIT, MIN_LOCK_WAIT)).execute("SELECT provider, tokens, updated_at FROM buckets")}
+            except sqlite3.Error:
+                pass
+        for provider, (rate, burst) in self.limits.items():
+            tokens, updated_at = rows.get(provider, (float(burst), now))
+            out[provider] = {
+                "rate": rate,
+                "burst": burst,
+                "tokens": round(min(float(burst), tokens + (now - updated_at) * rate), 2),
+            }
+        return {"path": self.path, "enabled": not self._broken, "max_wait": MAX_WAIT, "lock_timeouts": self.lock_timeouts, "providers": out}
+
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+
+from . import transport
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# One table for every currency; any pair is derived as rates[b] / rates[a].
+REFERENCE_BASE = "USD"
+REFERENCE_URL = f"https://open.er-api.com/v6/latest/{REFERENCE_BASE}"
+# open.er-api publishes once a day; hourly keeps us close without waste.
+REFRESH_INTERVAL = float(os.environ.get("ARBITRAGEX_REFERENCE_REFRESH", 3600))
+RETRY_INTERVAL = 60
+# Shared by all worker processes, and survives restarts of a long-lived host
+REFERENCE_SNAPSHOT = os.environ.get("ARBITRAGEX_REFERENCE_SNAPSHOT", "/tmp/arbitragex-reference-rates.json")
+
+# ==============================================================================
+# SERVICE
+# ==============================================================================
+class ReferenceRates:
+    """Mid-market reference rates from a single base-currency table.
+
+    The table is downloaded at most once per refresh interval, in the
+    background, and written to a snapshot file. Workers read a sibling's
+    fresh snapshot instead of downloading again. Lookups never wait on the
+    network unless asked to and nothing has been loaded yet.
+    """
+
+    def __init__(self, url=REFERENCE_URL, snapshot_path=REFERENCE_SNAPSHOT, refresh_interval=REFRESH_INTERVAL, retry_interval=RETRY_INTERVAL):
+        self.url = url
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.base = REFERENCE_BASE
+        self.rates = {}
+        self.fetched_at = None          # when the table was downloaded (by any worker)
+        self.published_at = None        # the provider's own timestamp
+        self._next_refresh = 0
+        self._snapshot_checked = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # --- loading ------------------------------------------------------------
+    def _apply(self, data, fetched_at):
+        rates = {}
+        for code, value in (data.get("rates") or {}).items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if value > 0:
+                rates[code.upper()] = value
+        if not rates:
+            return False
+        self.base = (data.get("base_code") or REFERENCE_BASE).upper()
+        self.rates = rates
+        self.fetched_at = fetched_at
+        self.published_at = data.get("time_last_update_unix")
+        self._next_refresh = fetched_at + self.refresh_interval
+        return True
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if self.fetched_at is not None and snapshot.get("fetched_at", 0) <= self.fetched_at:
+            return False
+        return self._apply(snapshot.get("data", {}), snapshot.get("fetched_at", 0))
+
+    def _save_snapshot(self, data):
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"fetched_at": self.fetched_at, "data": data}, f)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            print(f"Reference rate snapshot not written: {e}")
+
+    def refresh(self, force=False):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            # Another worker may have downloaded a fresh table already
+            if not force and self._load_snapshot() and time.time() < self._next_refresh:
+                return
+            # Not bound by the timeout cap of a provider call that needed a
+            # rate (TapTap's is learned from in-memory lookups)
+            cap = transport.timeout_cap.set(None)
+            try:
+                response = transport.get(self.url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get("result", "success") == "success" and self._apply(data, time.time()):
+                        self._save_snapshot(data)
+                        return
+            except Exception as e:
+                print(f"Reference rate refresh failed: {e}")
+            finally:
+                transport.timeout_cap.reset(cap)
+            self._next_refresh = time.time() + self.retry_interval
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _ensure_fresh(self, wait):
+        if not self._snapshot_checked:
+            self._snapshot_checked = True
+            self._load_snapshot()
+        if time.time() < self._next_refresh:
+            return
+        if wait and not self.rates:
+            self.refresh()
+        elif not self._refreshing:
+            threading.Thread(target=self.refresh, name="arbx-reference", daemon=True).start()
+
+    # --- lookups ------------------------------------------------------------
+    def rate(self, send_curr, receive_curr, wait=False):
+        """Mid-market units of receive_curr per send_curr, or None. With
+        wait=True the very first call may block on the download."""
+        self._ensure_fresh(wait)
+        rates = self.rates
+        send, receive = rates.get(send_curr.upper()), rates.get(receive_curr.upper())
+        if not send or not receive:
+            return None
+        return receive / send
+
+    def annotate(self, query, quotes):
+        """Adds mid-market comparison fields to quote dicts in place.
+
+        true_cost is what the sender pays in total minus what the recipient
+        gets valued at mid-market, in the send currency. It is comparable
+        across providers whether the fee is deducted from the amount or
+        charged on top (same convention as routing.Edge.convert).
+        """
+        amount, send_curr, recv_curr = query[0], query[1], query[2]
+        mid = self.rate(send_curr, recv_curr)
+        if not mid or amount <= 0:
+            return quotes
+        for q in quotes:
+            rate, fee, recipient_gets = q.get("rate", 0), q.get("fee", 0), q.get("recipient_gets", 0)
+            deducted = max(amount - recipient_gets / rate, 0.0) if rate > 0 else 0.0
+            outlay = amount + max(fee - deducted, 0.0)
+            true_cost = outlay - recipient_gets / mid
+            q["mid_market_rate"] = round(mid, 6)
+            q["rate_markup_pct"] = round((1 - rate / mid) * 100, 3) if rate > 0 else None
+            q["true_cost"] = round(true_cost, 2)
+            q["true_cost_pct"] = round(true_cost / outlay * 100, 3)
+        return quotes
+
+    def info(self):
+        return {"base": self.base, "published_at": self.published_at}
+
+    def status(self):
+        return {
+            "base": self.base,
+            "currencies": len(self.rates),
+            "fetched_at": self.fetched_at,
+            "published_at": self.published_at,
+            "refresh_interval": self.refresh_interval,
+            "snapshot": self.snapshot_path,
+        }
+
+REFERENCE_RATES = ReferenceRates()
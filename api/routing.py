@@ -0,0 +1,161 @@
+import math
+import os
+import threading
+import time
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+MAX_HOPS = 2
+# Candidate paths (ranked on rates alone) that get an exact, fee-aware evaluation
+CANDIDATES = 20
+# Observations older than this are not routed over
+MAX_EDGE_AGE = float(os.environ.get("ARBITRAGEX_ROUTE_MAX_AGE", 3600))
+# Amount tiers remembered per edge (fees and promo rates depend on amount)
+AMOUNTS_PER_EDGE = 16
+
+# ==============================================================================
+# EDGES
+# ==============================================================================
+class Edge:
+    """One provider + payout category between two (currency, country) nodes.
+
+    Keeps the latest quote per sent amount. For a given amount the nearest
+    observed tier is used.
+    """
+
+    def __init__(self, src, dst, provider, category):
+        self.src = src
+        self.dst = dst
+        self.provider = provider
+        self.category = category
+        self.observations = {}      # amount -> (rate, fee, recipient_gets, observed_at)
+
+    def observe(self, amount, rate, fee, recipient_gets, observed_at):
+        self.observations[amount] = (rate, fee, recipient_gets, observed_at)
+        if len(self.observations) > AMOUNTS_PER_EDGE:
+            oldest = min(self.observations, key=lambda a: self.observations[a][3])
+            del self.observations[oldest]
+
+    def latest(self):
+        return max(self.observations.values(), key=lambda o: o[3])
+
+    def nearest(self, amount):
+        tier = min(self.observations, key=lambda a: abs(math.log(max(a, 1e-9) / max(amount, 1e-9))))
+        return tier, self.observations[tier]
+
+    def convert(self, amount):
+        """Amount arriving at dst when `amount` is the sender's total outlay.
+
+        Some providers deduct the fee from the sent amount, others charge it
+        on top. Both are folded into one effective fee, so every route is
+        compared at equal outlay.
+        """
+        tier, (rate, fee, recipient_gets, observed_at) = self.nearest(amount)
+        if rate <= 0:
+            return 0.0, rate, 0.0, tier, observed_at
+        effective_fee = max(fee, tier - recipient_gets / rate, 0.0)
+        return max(amount - effective_fee, 0.0) * rate, rate, effective_fee, tier, observed_at
+
+# ==============================================================================
+# GRAPH
+# ==============================================================================
+class RateGraph:
+    """Directed graph of (currency, country) nodes built from observed quotes.
+
+    update() is a quote listener, so the graph follows whatever the fetchers
+    return and route queries never call an upstream.
+    """
+
+    def __init__(self):
+        # Re-entrant: route queries hold it across search and evaluation
+        self._lock = threading.RLock()
+        self._edges = {}        # (src, dst, provider, category) -> Edge
+
+    def update(self, provider_name, query, quotes):
+        amount, send_curr, recv_curr, send_cty, recv_cty = query
+        src, dst = (send_curr, send_cty), (recv_curr, recv_cty)
+        now = time.time()
+        with self._lock:
+            for q in quotes:
+                if q.get("rate", 0) <= 0:
+                    continue
+                key = (src, dst, q["provider"], q["category"])
+                edge = self._edges.get(key)
+                if edge is None:
+                    edge = self._edges[key] = Edge(src, dst, q["provider"], q["category"])
+                edge.observe(amount, q["rate"], q["fee"], q["recipient_gets"], now)
+
+    def _live_edges(self, now):
+        with self._lock:
+            return [e for e in self._edges.values() if e.observations and now - e.latest()[3] <= MAX_EDGE_AGE]
+
+    def candidate_paths(self, src, dst, max_hops=MAX_HOPS, category=None, now=None):
+        """Simple paths of up to max_hops edges ranked by sum(-log(rate)),
+        i.e. best rate product first. Log weights of FX rates are negative
+        as often as not, so instead of Dijkstra this is a hop-bounded
+        depth-first search (the graph has a few dozen nodes)."""
+        now = now or time.time()
+        out = {}
+        for e in self._live_edges(now):
+            out.setdefault(e.src, []).append((e, -math.log(e.latest()[0])))
+
+        paths = []
+        def walk(node, path, weight, visited):
+            for edge, w in out.get(node, []):
+                if edge.dst in visited:
+                    continue
+                if edge.dst == dst:
+                    if category is None or edge.category == category:
+                        paths.append((weight + w, path + [edge]))
+                elif len(path) + 1 < max_hops:
+                    walk(edge.dst, path + [edge], weight + w, visited | {edge.dst})
+
+        walk(src, [], 0.0, {src})
+        paths.sort(key=lambda p: p[0])
+        return [p for _, p in paths]
+
+    def best_routes(self, amount, send_curr, recv_curr, send_cty, recv_cty, max_hops=MAX_HOPS, category=None, limit=5):
+        now = time.time()
+        src = (send_curr.upper(), send_cty.upper())
+        dst = (recv_curr.upper(), recv_cty.upper())
+        routes = []
+        with self._lock:
+            candidates = self.candidate_paths(src, dst, max_hops, category, now)[:CANDIDATES]
+
+            # Fixed fees make the ranking amount-dependent, so the top
+            # candidates are re-ranked by exact evaluation at this amount.
+            for path in candidates:
+                sent = float(amount)
+                hops = []
+                for edge in path:
+                    received, rate, fee, tier, observed_at = edge.convert(sent)
+                    hops.append({
+                        "provider": edge.provider,
+                        "category": edge.category,
+                        "from": {"currency": edge.src[0], "country": edge.src[1]},
+                        "to": {"currency": edge.dst[0], "country": edge.dst[1]},
+                        "sent": round(sent, 4),
+                        "rate": rate,
+                        "fee": round(fee, 4),
+                        "received": round(received, 4),
+                        "quoted_amount": tier,
+                        "age": round(now - observed_at, 1),
+                    })
+                    sent = received
+                routes.append({
+                    "hops": hops,
+                    "recipient_gets": round(sent, 4),
+                    "effective_rate": round(sent / amount, 6) if amount else 0.0,
+                    "category": path[-1].category,
+                })
+
+        routes.sort(key=lambda r: -r["recipient_gets"])
+        return routes[:limit]
+
+    def stats(self):
+        with self._lock:
+            nodes = {e.src for e in self._edges.values()} | {e.dst for e in self._edges.values()}
+            return {"nodes": len(nodes), "edges": len(self._edges)}
+
+RATE_GRAPH = RateGraph()
@@ -0,0 +1,62 @@
+import threading
+
+# ==============================================================================
+# SINGLE-FLIGHT (concurrent identical calls share one upstream request)
+# ==============================================================================
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """The first caller for a key runs fn; callers arriving while it is in
+    flight wait for it and get the same result (or the same exception).
+
+    Keys are tuples whose first element is the provider name, which is what
+    the per-provider counters are grouped by.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            c = self._counters.setdefault(key[0], {"calls": 0, "coalesced": 0})
+            c["calls" if leader else "coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            per_key = {k: dict(v) for k, v in self._counters.items()}
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "calls": sum(v["calls"] for v in per_key.values()),
+            "coalesced": sum(v["coalesced"] for v in per_key.values()),
+            "providers": per_key,
+        }
+
+PROVIDER_FLIGHTS = SingleFlight()
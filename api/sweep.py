@@ -0,0 +1,185 @@
+import time
+
+from .fanout import MAX_BATCH_QUERIES, fetch_batch
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+CATEGORIES = ("Dépôt Bancaire", "Retrait en Espèces")
+# Amounts sampled across the range before any bisection
+INITIAL_POINTS = 9
+# Breakpoints are located to within this many units of the send currency
+RESOLUTION = 1.0
+MAX_QUERIES = 60
+# Grid used to predict where two providers cross inside an interval
+GRID = 256
+# Provider statuses that say nothing about whether it would have won
+INCOMPLETE_STATUSES = ("timeout", "error", "circuit_open", "rate_limited")
+
+# ==============================================================================
+# SWEEP
+# ==============================================================================
+def _engine(quote):
+    # "WorldRemit (BNK)" -> "WorldRemit", the name statuses are reported under
+    return quote["provider"].split(" (")[0]
+
+def _best(quotes, category, exclude=()):
+    """(provider, recipient_gets) of the best quote in a category, or None."""
+    best = None
+    for q in quotes:
+        if q["category"] != category or _engine(q) in exclude:
+            continue
+        if best is None or q["recipient_gets"] > best[1]:
+            best = (q["provider"], q["recipient_gets"])
+    return best
+
+def _winner(samples, amount, category, exclude=()):
+    best = _best(samples[amount], category, exclude)
+    return best[0] if best else None
+
+def _leaders(samples, failed, lo, hi, category):
+    """Winners at lo and hi among the providers that answered at both: one
+    that failed at either end is not a change of leader."""
+    exclude = failed[lo] | failed[hi]
+    return _winner(samples, lo, category, exclude), _winner(samples, hi, category, exclude)
+
+def _probe(samples, lo, hi, category, resolution):
+    """Next amount to query inside (lo, hi).
+
+    Each provider's recipient_gets is assumed linear between the two samples.
+    The whole grid is evaluated at once and the first amount where the
+    leader changes is taken as the predicted crossing. The probe is clamped
+    to the middle half of the interval, so a wrong guess (e.g. a fee tier
+    jump) still shrinks the interval to at most 3/4 of its width.
+    """
+    at = {}
+    for amount in (lo, hi):
+        for q in samples[amount]:
+            if q["category"] == category:
+                by_provider = at.setdefault(q["provider"], {})
+                by_provider[amount] = max(by_provider.get(amount, 0.0), q["recipient_gets"])
+    providers = [p for p, v in at.items() if lo in v and hi in v]
+
+    probe = (lo + hi) / 2
+    if len(providers) >= 2:
+        import numpy as np
+
+        grid = np.linspace(lo, hi, GRID)
+        start = np.array([at[p][lo] for p in providers])[:, None]
+        end = np.array([at[p][hi] for p in providers])[:, None]
+        predicted = start + (end - start) * (grid - lo) / (hi - lo)
+        leader = predicted.argmax(axis=0)
+        changes = np.flatnonzero(leader[1:] != leader[:-1])
+        if len(changes):
+            probe = float(grid[changes[0] + 1])
+
+    width = hi - lo
+    probe = min(max(probe, lo + width / 4), hi - width / 4)
+    probe = round(probe / resolution) * resolution
+    if probe <= lo or probe >= hi:
+        probe = lo + resolution
+    return probe
+
+def sweep(send_curr, recv_curr, send_cty, recv_cty, min_amount, max_amount, categories=CATEGORIES,
+          resolution=RESOLUTION, max_queries=MAX_QUERIES, deadline=None):
+    """Amounts in [min_amount, max_amount] where the best provider of each
+    payout category changes.
+
+    A coarse geometric grid is fetched first, then every interval whose two
+    ends have a different leader is narrowed until it is at most
+    `resolution` wide. Leaders are compared among the providers that
+    answered at both ends, so a timeout or rate limit is not a breakpoint;
+    amounts where a provider did not answer are fetched once more. Each
+    round is one fetch_batch, so repeated amounts come from the quote cache
+    and concurrent sweeps share in-flight calls.
+    """
+    if min_amount <= 0 or max_amount <= min_amount:
+        raise ValueError("Need 0 < min < max")
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+    if max_queries < 2:
+        raise ValueError("max_queries must be at least 2 (both ends of the range)")
+    import numpy as np
+
+    started = time.monotonic()
+
+    corridor = (send_curr, recv_curr, send_cty, recv_cty)
+    samples = {}            # amount -> quotes
+    failed = {}             # amount -> providers that did not answer
+    retried = set()
+    counters = {"queries": 0, "rounds": 0, "upstream_calls": 0, "cached": 0}
+
+    def fetch(amounts, again=False):
+        amounts = [a for a in dict.fromkeys(amounts) if again or a not in samples][:max_queries - counters["queries"]]
+        if not amounts:
+            return
+        for start in range(0, len(amounts), MAX_BATCH_QUERIES):
+            chunk = amounts[start:start + MAX_BATCH_QUERIES]
+            batch = fetch_batch([(a,) + corridor for a in chunk], deadline=deadline)
+            for amount, result in zip(chunk, batch["results"]):
+                samples[amount] = result["quotes"]
+                failed[amount] = {name for name, status in result["providers"].items() if status in INCOMPLETE_STATUSES}
+                for c in result["cache"].values():
+                    counters["cached" if c["status"] in ("hit", "stale", "expired") else "upstream_calls"] += 1
+        counters["queries"] += len(amounts)
+        counters["rounds"] += 1
+
+    grid = np.geomspace(min_amount, max_amount, max(INITIAL_POINTS, 2))
+    fetch([round(float(a) / resolution) * resolution for a in grid[1:-1]] + [float(min_amount), float(max_amount)])
+
+    while counters["queries"] < max_queries:
+        # Providers that answered come back from the cache; the others get
+        # a second chance before the amount is judged on partial data
+        retry = [a for a in sorted(samples) if failed[a] and a not in retried]
+        if retry:
+            retried.update(retry)
+            fetch(retry, again=True)
+            continue
+        amounts = sorted(samples)
+        probes = []
+        for lo, hi in zip(amounts, amounts[1:]):
+            if hi - lo <= resolution:
+                continue
+            for category in categories:
+                before, after = _leaders(samples, failed, lo, hi, category)
+                if before != after:
+                    probes.append(_probe(samples, lo, hi, category, resolution))
+                    break
+        if not probes:
+            break
+        fetch(probes)
+
+    amounts = sorted(samples)
+    result = {}
+    for category in categories:
+        segments, breakpoints = [], []
+        labelled = []           # per segment: whether `best` comes from a sample where every provider answered
+        for amount in amounts:
+            leader = _winner(samples, amount, category)
+            clean = not failed[amount]
+            if segments:
+                before, after = _leaders(samples, failed, segments[-1]["to"], amount, category)
+                if before == after:
+                    segments[-1]["to"] = amount
+                    if clean and not labelled[-1]:
+                        segments[-1]["best"], labelled[-1] = leader, True
+                    continue
+                breakpoints.append({
+                    "amount": amount,
+                    "after": segments[-1]["to"],
+                    "from": before,
+                    "to": after,
+                    # False when the budget ran out before reaching `resolution`
+                    "exact": amount - segments[-1]["to"] <= resolution,
+                })
+            segments.append({"from": amount, "to": amount, "best": leader})
+            labelled.append(clean)
+        result[category] = {"segments": segments, "breakpoints": breakpoints}
+
+    return {
+        "categories": result,
+        "samples": len(samples),
+        "incomplete": sorted(set().union(*failed.values())),
+        **counters,
+        "elapsed": round(time.monotonic() - started, 3),
+    }
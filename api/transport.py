@@ -0,0 +1,209 @@
+import contextvars
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from . import metrics
+
+# requests/urllib3 are imported when the first session is built, not at
+# import time: a cold start that never reaches an upstream skips them.
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+# Connections kept open per upstream host (one pool per host).
+POOL_SIZE = int(os.environ.get("ARBITRAGEX_POOL_SIZE", 10))
+# Retries cover connection failures and 502/503/504 only. Read timeouts are
+# never retried: the fan-out deadline already bounds how long we wait.
+RETRIES = int(os.environ.get("ARBITRAGEX_RETRIES", 1))
+BACKOFF = float(os.environ.get("ARBITRAGEX_BACKOFF", 0.2))
+KEEP_ALIVE = os.environ.get("ARBITRAGEX_KEEP_ALIVE", "1") != "0"
+# Send every upstream request to <override>/<original host><path> instead,
+# e.g. the stub server in bench/ (http://127.0.0.1:8899).
+UPSTREAM_OVERRIDE = os.environ.get("ARBITRAGEX_UPSTREAM_OVERRIDE")
+
+# Upper bound on per-request timeouts for the provider call running in the
+# current context. Set by the engine from the provider's observed latency;
+# it can only tighten the timeout a fetcher asks for.
+timeout_cap = contextvars.ContextVar("arbitragex_timeout_cap", default=None)
+
+# A list that every upstream request made in the current context is
+# appended to (its host), retries included, for callers that pay for
+# requests from a budget.
+request_tally = contextvars.ContextVar("arbitragex_request_tally", default=None)
+
+# ==============================================================================
+# HANDSHAKE COUNTING
+# ==============================================================================
+# connect() only runs when a socket is actually (re)opened, so requests minus
+# connects is the number of requests that went over a warm connection.
+_counts = {}
+_counts_lock = threading.Lock()
+
+def _bump(host, field):
+    with _counts_lock:
+        c = _counts.setdefault(host, {"requests": 0, "connections": 0})
+        c[field] += 1
+
+_pool_classes = None
+
+def _counting_pool_classes():
+    """urllib3 pool classes (by scheme) whose connections count connect(),
+    and every request sent (urllib3 retries included) into request_tally."""
+    global _pool_classes
+    if _pool_classes is None:
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class _Counting:
+            def connect(self):
+                _bump(f"{self.host}:{self.port}", "connections")
+                super().connect()
+
+            def request(self, *args, **kwargs):
+                tally = request_tally.get()
+                if tally is not None:
+                    tally.append(f"{self.host}:{self.port}")
+                return super().request(*args, **kwargs)
+
+        class _CountingHTTPConnection(_Counting, HTTPConnection):
+            pass
+
+        class _CountingHTTPSConnection(_Counting, HTTPSConnection):
+            pass
+
+        class _HTTPPool(HTTPConnectionPool):
+            ConnectionCls = _CountingHTTPConnection
+
+        class _HTTPSPool(HTTPSConnectionPool):
+            ConnectionCls = _CountingHTTPSConnection
+
+        _pool_classes = {"http": _HTTPPool, "https": _HTTPSPool}
+    return _pool_classes
+
+# ==============================================================================
+# SESSIONS (one pooled session per upstream host, shared by all threads)
+# ==============================================================================
+_sessions = {}
+_lock = threading.Lock()
+
+def _host_key(url):
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.hostname}:{port}"
+
+def _new_session():
+    from http.cookiejar import DefaultCookiePolicy
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=0,
+        status=RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    adapter.poolmanager.pool_classes_by_scheme = dict(_counting_pool_classes())
+    session = requests.Session()
+    # One session serves every user's requests to a host: a cookie set for
+    # one call (session, A/B bucket, geo) must not leak into the next.
+    # No allowed domains means no cookie is ever stored.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not KEEP_ALIVE:
+        session.headers["Connection"] = "close"
+    return session
+
+def session_for(url):
+    host = _host_key(url)
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _new_session()
+    return session
+
+def set_upstream_override(base_url):
+    global UPSTREAM_OVERRIDE
+    UPSTREAM_OVERRIDE = base_url
+
+def _redirect(url):
+    if not UPSTREAM_OVERRIDE:
+        return url
+    parts = urlsplit(url)
+    target = f"{UPSTREAM_OVERRIDE.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{target}?{parts.query}" if parts.query else target
+
+def request(method, url, **kwargs):
+    url = _redirect(url)
+    host = _host_key(url)
+    cap = timeout_cap.get()
+    if cap is not None and not isinstance(kwargs.get("timeout"), tuple):
+        requested = kwargs.get("timeout")
+        kwargs["timeout"] = cap if requested is None else min(requested, cap)
+
+    session = session_for(url)
+    import requests
+
+    _bump(host, "requests")
+    started = time.monotonic()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.Timeout:
+        metrics.record_upstream(host, method, time.monotonic() - started, error="timeout")
+        raise
+    except requests.ConnectionError:
+        metrics.record_upstream(host, method, time.monotonic() - started, error="connection")
+        raise
+    except Exception:
+        metrics.record_upstream(host, method, time.monotonic() - started, error="other")
+        raise
+
+    metrics.record_upstream(
+        host, method, time.monotonic() - started,
+        status_code=response.status_code, size=len(response.content),
+    )
+
+    # Fetchers call .json() themselves; count bodies that fail to decode
+    decode = response.json
+    def json(**kw):
+        try:
+            return decode(**kw)
+        except ValueError:
+            metrics.record_upstream(host, method, None, error="parse")
+            raise
+    response.json = json
+    return response
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+# ==============================================================================
+# STATS
+# ==============================================================================
+def stats():
+    """Per-host request and TCP/TLS handshake counts since startup."""
+    with _counts_lock:
+        counts = {host: dict(c) for host, c in _counts.items()}
+    for c in counts.values():
+        c["reused"] = max(c["requests"] - c["connections"], 0)
+    return counts
+
+def close_all():
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
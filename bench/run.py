@@ -0,0 +1,147 @@
+"""Throughput benchmark for /api/quotes against the local stub upstream.
+
+Drives the Flask app in-process at a given concurrency and reports latency
+percentiles and requests/sec. Results can be saved and compared run to run:
+
+    python -m bench.run --requests 500 --concurrency 16 --latency 80 --jitter 40 --save base.json
+    python -m bench.run --requests 500 --concurrency 16 --latency 80 --jitter 40 --compare base.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The app's shared state files default to the /tmp paths running workers
+# use; the benchmark keeps its own. Must be set before `api` is imported.
+STATE_DIR = tempfile.mkdtemp(prefix="arbx-bench-")
+os.environ.setdefault("ARBITRAGEX_REFERENCE_SNAPSHOT", os.path.join(STATE_DIR, "reference-rates.json"))
+os.environ.setdefault("ARBITRAGEX_CAPABILITIES", os.path.join(STATE_DIR, "capabilities.json"))
+os.environ.setdefault("ARBITRAGEX_HISTORY_DIR", os.path.join(STATE_DIR, "history"))
+
+from api import transport
+from api.cache import QUOTE_CACHE
+from api.ratelimit import RATE_LIMITER
+from api.index import app
+from bench.stub_upstream import StubUpstream
+
+CORRIDORS = [
+    ("USD", "MAD", "US", "MA"),
+    ("USD", "PHP", "US", "PH"),
+    ("EUR", "MAD", "FR", "MA"),
+    ("GBP", "BDT", "GB", "BD"),
+    ("CAD", "MAD", "CA", "MA"),
+]
+AMOUNTS = [50, 100, 500, 1000]
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(int(round(pct / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+def run(requests_total, concurrency, deadline=None, distinct=False):
+    client_local = {}
+
+    def one(i):
+        # Flask test clients are not thread-safe; one per worker thread
+        client = client_local.setdefault(threading.get_ident(), app.test_client())
+        send_curr, recv_curr, send_cty, recv_cty = CORRIDORS[i % len(CORRIDORS)]
+        # distinct=True gives every request its own amount, so nothing is
+        # served from the quote cache or coalesced
+        amount = 100 + i if distinct else AMOUNTS[(i // len(CORRIDORS)) % len(AMOUNTS)]
+        url = (f"/api/quotes?amount={amount}&sendCurr={send_curr}&recvCurr={recv_curr}"
+               f"&sendCty={send_cty}&recvCty={recv_cty}")
+        if deadline:
+            url += f"&deadline={deadline}"
+        started = time.perf_counter()
+        resp = client.get(url)
+        elapsed = time.perf_counter() - started
+        body = resp.get_json(silent=True) or {}
+        return elapsed, resp.status_code, len(body.get("quotes", [])), body.get("timed_out", [])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests_total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    return {
+        "requests": requests_total,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "rps": round(requests_total / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "http_errors": sum(1 for r in results if r[1] != 200),
+        "avg_quotes": round(sum(r[2] for r in results) / max(len(results), 1), 2),
+        "timeouts": sum(len(r[3]) for r in results),
+    }
+
+def print_report(report, baseline=None):
+    print(f"\n=== /api/quotes benchmark ({report['requests']} requests, concurrency {report['concurrency']}) ===")
+    for key in ("rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "http_errors", "avg_quotes", "timeouts"):
+        line = f"{key:<12} {report[key]:>10}"
+        if baseline and key in baseline and baseline[key]:
+            delta = (report[key] - baseline[key]) / baseline[key] * 100
+            line += f"   (baseline {baseline[key]}, {delta:+.1f}%)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=50.0, help="stub latency, milliseconds")
+    parser.add_argument("--jitter", type=float, default=20.0, help="stub jitter, milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--deadline", type=float, default=None)
+    parser.add_argument("--cache", action="store_true", help="keep the quote cache on (off by default)")
+    parser.add_argument("--rate-limit", action="store_true", help="apply the provider rate limits (off by default)")
+    parser.add_argument("--distinct", action="store_true", help="unique amount per request")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--compare", help="baseline report to diff against")
+    args = parser.parse_args()
+
+    stub = StubUpstream(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                        error_rate=args.error_rate, seed=args.seed).start()
+    transport.set_upstream_override(stub.url)
+    if not args.cache:
+        QUOTE_CACHE.max_entries = 0
+    # The limits are for the real upstreams; when on, use private buckets
+    # rather than the ones shared with any running workers.
+    if args.rate_limit:
+        RATE_LIMITER.path = os.path.join(STATE_DIR, "ratelimit.sqlite")
+    else:
+        RATE_LIMITER.limits = {}
+
+    try:
+        if args.warmup:
+            run(args.warmup, min(args.concurrency, args.warmup), args.deadline, args.distinct)
+        report = run(args.requests, args.concurrency, args.deadline, args.distinct)
+    finally:
+        stub.stop()
+
+    report["stub"] = {"latency_ms": args.latency, "jitter_ms": args.jitter, "error_rate": args.error_rate}
+    report["cache"] = args.cache
+    report["rate_limit"] = args.rate_limit
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved to {args.save}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Cold-start benchmark: import time of api.index and time to first response.
+
+Every run is a fresh interpreter, like a new serverless instance. The first
+/api/quotes request goes to the local stub upstream, so the numbers do not
+depend on the network. Exits non-zero when the median import or first
+response is over budget, or when a module that must load lazily was
+imported at startup:
+
+    python -m bench.startup --runs 7 --import-budget 400 --first-response-budget 1200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import api.index`; they are loaded on first use
+LAZY_MODULES = [
+    "numpy",
+    "requests",
+    "urllib3",
+    "bs4",
+    "lxml",
+    "api.providers.remitly",
+    "api.providers.taptap",
+    "api.providers.wise",
+    "api.providers.westernunion",
+    "api.providers.worldremit",
+    "api.providers.sendwave",
+]
+
+FIRST_URL = "/api/quotes?amount=100&sendCurr=USD&recvCurr=MAD&sendCty=US&recvCty=MA"
+
+def child():
+    """One cold start; prints a JSON line with the timings."""
+    started = time.perf_counter()
+    from api.index import app
+    imported = time.perf_counter()
+    eager = [m for m in LAZY_MODULES if m in sys.modules]
+
+    response = app.test_client().get(FIRST_URL)
+    answered = time.perf_counter()
+    body = response.get_json(silent=True) or {}
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "first_response_ms": (answered - imported) * 1000,
+        "status": response.status_code,
+        "quotes": len(body.get("quotes", [])),
+        "eager": eager,
+    }))
+
+def run_once(env):
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.startup", "--child"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=400.0, help="milliseconds, median")
+    parser.add_argument("--first-response-budget", type=float, default=1200.0, help="milliseconds, median")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub upstream latency, milliseconds")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    # Imported here so the children (which only run child()) do not preload
+    # stdlib modules the app would otherwise pay for
+    from bench.stub_upstream import StubUpstream
+
+    stub = StubUpstream(latency=args.latency / 1000).start()
+    history_dir = tempfile.mkdtemp(prefix="arbx-startup-")
+    env = dict(
+        os.environ,
+        ARBITRAGEX_UPSTREAM_OVERRIDE=stub.url,
+        ARBITRAGEX_HISTORY_DIR=history_dir,
+        ARBITRAGEX_CAPABILITIES=os.path.join(history_dir, "capabilities.json"),
+        ARBITRAGEX_REFERENCE_SNAPSHOT=os.path.join(history_dir, "reference-rates.json"),
+        ARBITRAGEX_RATELIMIT_DB=os.path.join(history_dir, "ratelimit.sqlite"),
+        ARBITRAGEX_PREFETCH="0",
+    )
+    try:
+        # Unmeasured run so every run below reads warm bytecode caches
+        run_once(env)
+        results = [run_once(env) for _ in range(args.runs)]
+    finally:
+        stub.stop()
+
+    def summary(field):
+        values = [r[field] for r in results]
+        return statistics.median(values), max(values)
+
+    print(f"Cold starts: {args.runs} (fresh interpreter each)")
+    for field, label in (("import_ms", "import api.index"), ("first_response_ms", "first /api/quotes"), ("process_ms", "whole process")):
+        median, worst = summary(field)
+        print(f"  {label:<20} median {median:7.1f} ms   max {worst:7.1f} ms")
+    print(f"  first response: HTTP {results[0]['status']}, {results[0]['quotes']} quotes")
+
+    failures = []
+    import_median, _ = summary("import_ms")
+    first_median, _ = summary("first_response_ms")
+    if import_median > args.import_budget:
+        failures.append(f"import {import_median:.1f} ms > budget {args.import_budget:.0f} ms")
+    if first_median > args.first_response_budget:
+        failures.append(f"first response {first_median:.1f} ms > budget {args.first_response_budget:.0f} ms")
+    eager = sorted({m for r in results for m in r["eager"]})
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+    if any(r["status"] != 200 for r in results):
+        failures.append("first response was not HTTP 200")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: within startup budget")
+
+if __name__ == "__main__":
+    main()
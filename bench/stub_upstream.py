@@ -0,0 +1,144 @@
+"""Local stand-in for every upstream the fetchers call.
+
+Serves the recorded payloads in bench/payloads with configurable latency,
+jitter and error rate. Point the app at it with
+ARBITRAGEX_UPSTREAM_OVERRIDE=http://127.0.0.1:<port> (or
+transport.set_upstream_override); requests then arrive as
+/<original host><original path>.
+
+    python -m bench.stub_upstream --port 8899 --latency 80 --jitter 40 --error-rate 0.02
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+
+# (host, path) -> recorded payload
+ROUTES = {
+    ("app.sendwave.com", "/v2/pricing-segments"): "sendwave_pricing_segments.json",
+    ("app.sendwave.com", "/v2/pricing-public"): "sendwave_pricing_public.json",
+    ("www.westernunion.com", "/wuconnect/prices/catalog"): "westernunion_catalog.json",
+    ("api.remitly.io", "/v3/calculator/estimate"): "remitly_estimate.json",
+    ("api.taptapsend.com", "/api/fxRates"): "taptap_fxrates.json",
+    ("wise.com", "/gateway/v4/comparisons"): "wise_comparisons.json",
+    ("api.worldremit.com", "/graphql"): "worldremit_graphql.json",
+    ("open.er-api.com", "/v6/latest"): "er_api_latest.json",
+    # Not used by a fetcher yet; same shape as the mock in api/test.py
+    ("www.xoom.com", "/xoom/remittance"): "xoom_remittance.json",
+}
+
+def load_payloads():
+    payloads = {}
+    for route, filename in ROUTES.items():
+        with open(os.path.join(PAYLOAD_DIR, filename), "rb") as f:
+            payloads[route] = f.read()
+    return payloads
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 overflows under load and shows up as 1s
+    # SYN-retransmit spikes that the real upstreams would not cause.
+    request_queue_size = 256
+
+class StubUpstream:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency          # seconds
+        self.jitter = jitter            # seconds, uniform +/- around latency
+        self.error_rate = error_rate    # fraction of requests answered with 503
+        self.payloads = load_payloads()
+        self.hits = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _route(self, path):
+        path = path.split("?", 1)[0].lstrip("/")
+        host, _, rest = path.partition("/")
+        rest = "/" + rest
+        for (r_host, r_path), body in self.payloads.items():
+            if host == r_host and rest.startswith(r_path):
+                return (r_host, r_path), body
+        return None, None
+
+    def _delay_and_fail(self):
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real upstreams
+            # Headers and body go out in separate small writes; with Nagle on,
+            # the body waits for the client's delayed ACK (~40 ms) on every
+            # reused connection.
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                route, body = stub._route(self.path)
+                with stub._lock:
+                    stub.hits[route] = stub.hits.get(route, 0) + 1
+                if route is None:
+                    status, body = 404, b'{"error": "no recorded payload"}'
+                elif stub._delay_and_fail():
+                    status, body = 503, b'{"error": "injected failure"}'
+                else:
+                    status = 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubUpstream(args.host, args.port, args.latency / 1000, args.jitter / 1000, args.error_rate)
+    print(f"Stub upstream on {stub.url} ({len(stub.payloads)} recorded endpoints)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
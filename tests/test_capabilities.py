@@ -0,0 +1,88 @@
+import pytest
+
+from api import fanout
+from api.capabilities import CapabilityIndex, mark_unsupported
+
+CORRIDOR = ("USD", "MAD", "US", "MA")
+
+def query(amount):
+    return (float(amount),) + CORRIDOR
+
+QUOTE = {"provider": "Fake", "category": "Dépôt Bancaire", "rate": 10.0, "fee": 0.0, "recipient_gets": 1000.0}
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = CapabilityIndex(path=str(tmp_path / "capabilities.json"))
+    monkeypatch.setattr(fanout, "CAPABILITIES", index)
+    # No reference-rate download from the tests
+    monkeypatch.setattr(fanout.REFERENCE_RATES, "annotate", lambda query, quotes: quotes)
+    return index
+
+def test_empties_below_provider_minimum_do_not_block_corridor(index):
+    for amount in (1, 2, 1, 2, 3):
+        index.record("Fake", query(amount), [])
+    assert index.allows("Fake", query(100))
+
+def test_empties_at_few_sane_amounts_do_not_block_corridor(index):
+    index.record("Fake", query(100), [])
+    index.record("Fake", query(100), [])
+    index.record("Fake", query(200), [])
+    assert index.allows("Fake", query(150))
+
+def test_empties_at_several_sane_amounts_block_corridor(index):
+    for amount in (50, 100, 500):
+        index.record("Fake", query(amount), [])
+    assert not index.allows("Fake", query(150))
+
+def test_unsupported_signal_blocks_corridor_at_once(index):
+    index.record("Fake", query(100), [], unsupported="no pricing segments")
+    assert not index.allows("Fake", query(250))
+    entry = index.status()["providers"]["Fake"][0]
+    assert entry["supported"] is False
+    assert entry["reason"] == "no pricing segments"
+
+def test_quotes_reset_empty_count(index):
+    index.record("Fake", query(50), [])
+    index.record("Fake", query(100), [])
+    index.record("Fake", query(200), [QUOTE])
+    index.record("Fake", query(500), [])
+    assert index.allows("Fake", query(150))
+
+def test_engine_does_not_learn_amount_limits(index):
+    # Nothing below a minimum send amount, a quote above it
+    def fetcher(amount, *corridor):
+        return dict(QUOTE) if amount >= 10 else None
+
+    providers = [("FakeMin", fetcher)]
+    for amount in (1, 2):
+        [result] = fanout.iter_provider_results(query(amount), providers=providers)
+        assert result["status"] == "empty"
+    [result] = fanout.iter_provider_results(query(100), providers=providers)
+    assert result["status"] == "ok"
+
+@pytest.mark.parametrize("amount", [1, 50000])
+def test_engine_ignores_signals_at_out_of_range_amounts(index, amount):
+    # WorldRemit and Western Union refuse out-of-range amounts with the
+    # same answers they give for unserved corridors
+    def fetcher(amount, *corridor):
+        if not 20 <= amount <= 5000:
+            mark_unsupported("calculation errors for every payout method")
+            return None
+        return dict(QUOTE)
+
+    providers = [(f"FakeRange{amount}", fetcher)]
+    [result] = fanout.iter_provider_results(query(amount), providers=providers)
+    assert result["status"] == "empty"
+    [result] = fanout.iter_provider_results(query(100), providers=providers)
+    assert result["status"] == "ok"
+
+def test_engine_learns_from_fetcher_signal(index):
+    def fetcher(amount, *corridor):
+        mark_unsupported("no ISO-3 code for XX")
+        return None
+
+    providers = [("FakeUnsupported", fetcher)]
+    [result] = fanout.iter_provider_results(query(101), providers=providers)
+    assert result["status"] == "empty"
+    [result] = fanout.iter_provider_results(query(102), providers=providers)
+    assert result["status"] == "unsupported"
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from api import fanout, health
+from api.capabilities import CapabilityIndex
+from api.health import CLOSED, HALF_OPEN, OPEN, ProviderHealth
+
+QUERY = (100.0, "USD", "MAD", "US", "MA")
+QUOTE = {"provider": "Fake", "category": "Dépôt Bancaire", "rate": 10.0, "fee": 0.0, "recipient_gets": 1000.0}
+
+def opened(h):
+    for _ in range(health.FAILURE_THRESHOLD):
+        h.record_failure()
+    assert h.state == OPEN
+    return h
+
+def cooled(h):
+    h.opened_at -= health.COOLDOWN
+    return h
+
+def test_consecutive_failures_open_the_breaker():
+    h = ProviderHealth("Fake")
+    for _ in range(health.FAILURE_THRESHOLD - 1):
+        h.record_failure()
+    h.record_success(0.1)
+    h.record_failure()
+    assert h.state == CLOSED
+    opened(h)
+    assert not h.allow()
+
+def test_half_open_admits_probes_then_closes():
+    h = cooled(opened(ProviderHealth("Fake")))
+    admitted = [h.allow() for _ in range(health.HALF_OPEN_PROBES + 1)]
+    assert h.state == HALF_OPEN
+    assert admitted == [True] * health.HALF_OPEN_PROBES + [False]
+    for _ in range(health.HALF_OPEN_PROBES):
+        h.record_success(0.1)
+    assert h.state == CLOSED
+
+def test_half_open_failure_reopens():
+    h = cooled(opened(ProviderHealth("Fake")))
+    assert h.allow()
+    h.record_failure()
+    assert h.state == OPEN
+    assert not h.allow()
+
+def test_timeout_tightens_with_latency_and_resets_after_failure():
+    h = ProviderHealth("Fake", max_timeout=10.0)
+    assert h.timeout() == 10.0
+    for _ in range(health.MIN_SAMPLES):
+        h.record_success(0.1)
+    assert h.timeout() == health.MIN_TIMEOUT
+    h.record_failure(timed_out_at=health.MIN_TIMEOUT)
+    assert h.timeout() == 10.0
+
+def test_timed_out_calls_let_the_timeout_grow_back():
+    h = ProviderHealth("Fake", max_timeout=10.0)
+    for _ in range(health.MIN_SAMPLES):
+        h.record_success(0.1)
+    for _ in range(3):
+        h.record_failure(timed_out_at=h.timeout())
+        h.record_success(0.1)
+    assert h.timeout() > health.MIN_TIMEOUT
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    notified = []
+    monkeypatch.setattr(fanout, "CAPABILITIES", CapabilityIndex(path=str(tmp_path / "capabilities.json")))
+    monkeypatch.setattr(fanout, "QUOTE_LISTENERS", [lambda name, query, quotes: notified.append(name)])
+    monkeypatch.setattr(fanout, "HEDGING", True)
+    return notified
+
+def test_hedged_probe_counts_once(engine):
+    name = "FakeHedged"
+    h = health.health_for(name)
+    for _ in range(health.MIN_SAMPLES):
+        h.record_success(0.001)
+    cooled(opened(h))
+
+    attempts = []
+    def fetcher(*query):
+        attempts.append(query)
+        time.sleep(0.05)
+        return dict(QUOTE)
+
+    # The hedge fires after the 1 ms p95, so both attempts run
+    assert fanout._fetch_upstream(name, fetcher, QUERY) == [QUOTE]
+    # Let the losing attempt finish too
+    time.sleep(0.2)
+    assert len(attempts) == 2
+    # One admitted probe is one probe success: the breaker stays half-open
+    assert h.state == HALF_OPEN
+    assert h._probe_successes == 1
+    assert engine == [name]
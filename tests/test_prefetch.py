@@ -0,0 +1,43 @@
+import pytest
+
+from api import prefetch, transport
+from api.prefetch import PrefetchScheduler, normalize_query
+
+CORRIDOR = ("USD", "MAD", "US", "MA")
+
+def test_long_idle_demand_is_forgotten_not_divided_by():
+    scheduler = PrefetchScheduler(corridors=[CORRIDOR], amounts=[])
+    query = normalize_query(250, *CORRIDOR)
+    scheduler.record_demand(query)
+    # Requested 8 days ago: the decayed weight underflows to 0.0
+    score, updated_at = scheduler._demand[query]
+    scheduler._demand[query] = (score, updated_at - 8 * 86400)
+
+    assert scheduler.due() == []
+    assert query not in scheduler._demand
+
+def test_budget_is_shared_between_processes(tmp_path):
+    # Two schedulers on one database stand in for two worker processes
+    path = str(tmp_path / "ratelimit.sqlite")
+    cost = prefetch.UPSTREAM_REQUESTS.get("Wise", 1) * (1 + transport.RETRIES)
+    first = PrefetchScheduler(corridors=[CORRIDOR], amounts=[], budget_per_minute=3 * cost, budget_path=path)
+    second = PrefetchScheduler(corridors=[CORRIDOR], amounts=[], budget_per_minute=3 * cost, budget_path=path)
+
+    taken = [s._take_tokens("Wise") for s in (first, second, first, second)]
+    assert taken == [cost, cost, cost, 0]
+
+def test_unsent_requests_are_refunded(tmp_path, monkeypatch):
+    # Sendwave reserves for its worst case; a call that sends one request
+    # only spends one
+    def refresh(name, query):
+        transport.request_tally.get().append("app.sendwave.com:443")
+
+    monkeypatch.setattr(prefetch, "refresh_provider", refresh)
+    path = str(tmp_path / "ratelimit.sqlite")
+    budget = 10
+    scheduler = PrefetchScheduler(corridors=[CORRIDOR], amounts=[], budget_per_minute=budget, budget_path=path)
+    reserved = scheduler._take_tokens("Sendwave")
+    assert reserved > 1
+    scheduler._refresh("Sendwave", normalize_query(100, *CORRIDOR), reserved)
+
+    assert scheduler.status()["tokens"]["Sendwave"] == pytest.approx(budget - 1, abs=0.1)
@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from api.ratelimit import RateLimited, RateLimiter
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "ratelimit.sqlite")
+
+def test_tokens_are_shared_between_connections(path):
+    # Two limiters on one file stand in for two worker processes
+    a = RateLimiter(path=path, limits={"Fake": (0.1, 3)})
+    b = RateLimiter(path=path, limits={"Fake": (0.1, 3)})
+    assert a.acquire("Fake", max_wait=0) == 0.0
+    assert b.acquire("Fake", max_wait=0) == 0.0
+    assert a.acquire("Fake", max_wait=0) == 0.0
+    with pytest.raises(RateLimited):
+        b.acquire("Fake", max_wait=0)
+    with pytest.raises(RateLimited):
+        a.acquire("Fake", max_wait=0)
+
+def test_waits_for_a_token_within_budget(path):
+    limiter = RateLimiter(path=path, limits={"Fake": (10.0, 1)})
+    limiter.acquire("Fake", max_wait=0)
+    started = time.monotonic()
+    waited = limiter.acquire("Fake", max_wait=0.5)
+    assert 0.05 < waited <= 0.1
+    assert time.monotonic() - started < 0.5
+
+def test_over_budget_wait_reserves_nothing(path):
+    limiter = RateLimiter(path=path, limits={"Fake": (10.0, 1)})
+    limiter.acquire("Fake", max_wait=0)
+    with pytest.raises(RateLimited):
+        limiter.acquire("Fake", max_wait=0.02)
+    # The refused caller took no token: the next one is due after 0.1 s
+    time.sleep(0.1)
+    assert limiter.acquire("Fake", max_wait=0) == 0.0
+
+def test_lock_wait_counts_against_budget(path):
+    # Next token in 0.5 s; the lock is held for 0.3 s of the 0.4 s budget.
+    # The remaining 0.2 s wait alone fits the budget, lock wait plus it not.
+    limiter = RateLimiter(path=path, limits={"Fake": (2.0, 1)})
+    limiter.acquire("Fake", max_wait=0)
+    holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.3, holder.execute, ("COMMIT",)).start()
+
+    started = time.monotonic()
+    with pytest.raises(RateLimited):
+        limiter.acquire("Fake", max_wait=0.4)
+    assert time.monotonic() - started < 0.4
+
+def test_lock_timeout_fails_open_for_that_call_only(path):
+    limiter = RateLimiter(path=path, limits={"Fake": (0.1, 1)})
+    limiter.acquire("Fake", max_wait=0)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        assert limiter.acquire("Fake", max_wait=0.05) == 0.0
+        assert time.monotonic() - started < 0.05 + 0.05
+    finally:
+        holder.execute("ROLLBACK")
+    assert limiter.lock_timeouts == 1
+    assert limiter.status()["enabled"]
+    # Still limiting once the lock is free
+    with pytest.raises(RateLimited):
+        limiter.acquire("Fake", max_wait=0)
+
+def test_budget_that_must_hold_fails_closed(path):
+    limiter = RateLimiter(path=path, limits={"Fake": (0.1, 1)}, fail_open=False)
+    limiter.acquire("Fake", max_wait=0)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(RateLimited):
+            limiter.acquire("Fake", max_wait=0)
+    finally:
+        holder.execute("ROLLBACK")